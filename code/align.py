@@ -1,13 +1,27 @@
 import collections
+import functools
+import itertools
+import math
 
+import editdistance
+import numpy as np
+
+from code.phon.base import CostMatrix
+
+
+
+"""
+Bit flags for the moves on a dynamic programming sequence alignment matrix,
+used as backpointers; in terms of arrows, these are: . ← ↑ ←↑↑ ←←↑
+"""
+DIAG, LEFT, UP, SPLIT, MERGE = 1, 2, 4, 8, 16
 
 
 """
-Tuple representing a cell in a dynamic programming sequence alignment matrix.
-The second element is used for backtracking and should be a frozen set of any
-of these strings: . ← ↑ ←↑↑ ←←↑
+The moves allowed on an alignment matrix, as (flag, dx, dy) tuples; the last
+two are only used by the algorithms that allow merges and splits.
 """
-MatrixCell = collections.namedtuple('MatrixCell', 'cost, back')
+MOVES = [(DIAG, 1, 1), (LEFT, 1, 0), (UP, 0, 1), (SPLIT, 1, 2), (MERGE, 2, 1)]
 
 
 """
@@ -17,77 +31,277 @@ a tuple of the corresponding elements.
 Alignment = collections.namedtuple('Alignment', 'delta, corr')
 
 
+"""
+Counters of the work done by the align funcs since the module was imported
+(or the counters were cleared): cells is the number of alignment matrix cells
+filled, costs the number of costs fetched from the cost funcs (be it by
+calling these or by looking the costs up in their tables), and pairs the
+number of sequence pairs passed on to align_pairs.
+"""
+COUNTERS = collections.Counter()
+
+
 
-def backtrack(seq_a, seq_b, matrix):
+class Matrix:
 	"""
-	Backtrack through an alignment matrix of two sequences. Return the set of
-	tuples of corresponding sequence elements.
+	Dynamic programming sequence alignment matrix, stored as a 2d float array
+	of cell costs and a 2d uint8 array of backpointers. Each bit of the latter
+	flags one of the moves (see MOVES) that reach the cell at minimum cost.
 	"""
-	def recurse(x, y):
+
+	def __init__(self, cost, back):
+		"""
+		Init the instance's props; the args should be 2d arrays of the same
+		shape, (len_a + 1, len_b + 1).
+		"""
+		self.cost = cost
+		self.back = back
+
+
+	@classmethod
+	def blank(cls, len_a, len_b):
+		"""
+		Return a Matrix instance for aligning sequences of the given lengths,
+		with all costs set to infinity and no backpointers.
+		"""
+		return cls(
+			np.full((len_a + 1, len_b + 1), np.inf),
+			np.zeros((len_a + 1, len_b + 1), dtype=np.uint8))
+
+
+
+def iter_backtrack(seq_a, seq_b, matrix):
+	"""
+	Generate the tuples of corresponding sequence elements, one per optimal
+	path through an alignment matrix of two sequences. The paths are explored
+	depth-first using an explicit stack, so that only the paths consumed are
+	ever built; at each cell the moves are tried in the order given by MOVES.
+	"""
+	back = matrix.back.tolist()
+
+	# the partial paths are linked lists of (corr, rest) tuples, built from the
+	# bottom-right cell backwards, so that branches can share their tails
+	stack = [(len(seq_a), len(seq_b), None)]
+
+	while stack:
+		x, y, path = stack.pop()
+
 		if x == 0 and y == 0:
-			return [[]]
+			corr = []
+			while path is not None:
+				corr.append(path[0])
+				path = path[1]
+			yield tuple(corr)
+			continue
+
+		flags = back[x][y]
 
-		res = []
+		if flags & MERGE:
+			stack.append((x-2, y-1,
+				((tuple(seq_a[x-2:x]), seq_b[y-1]), path)))
 
-		for pointer in matrix[(x, y)].back:
-			if pointer == '←':
-				args, corr = (x-1, y), (seq_a[x-1], '')
-			elif pointer == '↑':
-				args, corr = (x, y-1), ('', seq_b[y-1])
-			elif pointer == '.':
-				args, corr = (x-1, y-1), (seq_a[x-1], seq_b[y-1])
-			elif pointer == '←↑↑':
-				args, corr = (x-1, y-2), (seq_a[x-1], tuple(seq_b[y-2:y]))
-			elif pointer == '←←↑':
-				args, corr = (x-2, y-1), (tuple(seq_a[x-2:x]), seq_b[y-1])
+		if flags & SPLIT:
+			stack.append((x-1, y-2,
+				((seq_a[x-1], tuple(seq_b[y-2:y])), path)))
 
-			res.extend([li + [corr] for li in recurse(*args)])
+		if flags & UP:
+			stack.append((x, y-1, (('', seq_b[y-1]), path)))
 
-		return res
+		if flags & LEFT:
+			stack.append((x-1, y, ((seq_a[x-1], ''), path)))
+
+		if flags & DIAG:
+			stack.append((x-1, y-1, ((seq_a[x-1], seq_b[y-1]), path)))
+
+
+
+def backtrack(seq_a, seq_b, matrix, max_alignments=None):
+	"""
+	Backtrack through an alignment matrix of two sequences. Return the set of
+	tuples of corresponding sequence elements.
+
+	If max_alignments is set, stop after that many optimal paths; setting it to
+	1 yields the first optimal path only.
+	"""
+	return frozenset(itertools.islice(
+		iter_backtrack(seq_a, seq_b, matrix), max_alignments))
+
+
+
+def _alignments(seq_a, seq_b, matrix, max_alignments=None, cost=None):
+	"""
+	Backtrack through a filled alignment matrix of two sequences and return
+	the frozen set of the Alignment tuples of its optimal paths (at most
+	max_alignments of these, if set). Unless given, the cost of the alignments
+	is read off the bottom-right cell.
+	"""
+	if cost is None:
+		cost = matrix.cost[len(seq_a), len(seq_b)].item()
 
 	return frozenset([
-		tuple(li) for li in recurse(len(seq_a), len(seq_b))])
+		Alignment(cost, corr) for corr in backtrack(
+			seq_a, seq_b, matrix, max_alignments) ])
 
 
 
-def simple_align(seq_a, seq_b, cost_func):
+def _cost_cols(seq_a, seq_b, cost_func):
 	"""
-	Align two sequences using the standard Needleman-Wunsch algorithm. The last
-	arg should be a elem_a, elem_b → float function; it should accept the empty
-	string as the value of either of its args, in which case the return value
-	can be seen as the respective indel penalty.
+	Return (1) the list of the deletion costs of the elements of seq_a and (2)
+	a generator of (sub, ins) tuples, one per element of seq_b: the list of
+	its substitution costs against the elements of seq_a and its insertion
+	cost. Only a column of costs is held at a time.
 
-	Return the alignments of minimum cost as a frozen set of Alignment tuples.
+	If the cost func is a CostMatrix covering all the elements, the costs are
+	looked up in its table; otherwise the cost func is called once per pair.
+	"""
+	COUNTERS['costs'] += (len(seq_a) + 1) * (len(seq_b) + 1) - 1
+
+	if isinstance(cost_func, CostMatrix):
+		try:
+			enc_a, enc_b = cost_func.encode_a(seq_a), cost_func.encode_b(seq_b)
+		except (KeyError, TypeError):
+			pass
+		else:
+			table = cost_func.table
+			return table[enc_a, 0].tolist(), (
+				(table[enc_a, id_b].tolist(), table[0, id_b].item())
+				for id_b in enc_b.tolist())
+
+	del_a = [cost_func(elem_a, '') for elem_a in seq_a]
+
+	return del_a, (
+		([cost_func(elem_a, elem_b) for elem_a in seq_a], cost_func('', elem_b))
+		for elem_b in seq_b)
+
+
+
+def _cost_lists(seq_a, seq_b, cost_func):
+	"""
+	Return (1) the list of lists of substitution costs between the elements of
+	two sequences, and (2, 3) the lists of the deletion costs of the elements of
+	seq_a and of the insertion costs of those of seq_b. Unlike _cost_cols, all
+	the costs are held at once.
+	"""
+	del_a, cost_cols = _cost_cols(seq_a, seq_b, cost_func)
+
+	sub_cols, ins_b = [], []
+	for sub, ins in cost_cols:
+		sub_cols.append(sub)
+		ins_b.append(ins)
+
+	if sub_cols:
+		sub = [list(row) for row in zip(*sub_cols)]
+	else:
+		sub = [[] for _ in seq_a]
+
+	return sub, del_a, ins_b
+
+
+
+def _merge_cost_lists(seq_a, seq_b, cost_func):
+	"""
+	Return the lists of lists of (1) the split costs, element (x, y) being the
+	cost of seq_a[x] against seq_b[y:y+2], and (2) the merge costs, element
+	(x, y) being that of seq_a[x:x+2] against seq_b[y].
+	"""
+	len_a, len_b = len(seq_a), len(seq_b)
+	COUNTERS['costs'] += len_a * max(len_b - 1, 0) + max(len_a - 1, 0) * len_b
+
+	split = [[cost_func(seq_a[x], seq_b[y:y+2]) for y in range(len(seq_b) - 1)]
+			for x in range(len(seq_a))]
+	merge = [[cost_func(seq_a[x:x+2], seq_b[y]) for y in range(len(seq_b))]
+			for x in range(len(seq_a) - 1)]
+
+	return split, merge
+
+
+
+def _fill(seq_a, seq_b, cost_func, merges=False, band=None, costs=None):
 	"""
-	matrix = {}  # (x, y): MatrixCell
+	Fill the alignment matrix of two sequences column by column, keeping only
+	the last few columns as python lists. Return the Matrix instance and the
+	cost of the bottom-right cell (as returned by the cost func).
+
+	If a band is given, as a (lo, hi) tuple, only the cells (x, y) for which
+	lo <= y - x <= hi are filled and the rest are left at infinity. The costs
+	of the moves can be passed on as well, as returned by _cost_lists (with
+	the two lists of _merge_cost_lists appended if merges is set).
+
+	Helper for the simple_align, merge_align, and banded align funcs.
+	"""
+	len_a, len_b = len(seq_a), len(seq_b)
+	matrix = Matrix.blank(len_a, len_b)
+
+	if costs is None:
+		costs = _cost_lists(seq_a, seq_b, cost_func)
+		if merges:
+			costs += _merge_cost_lists(seq_a, seq_b, cost_func)
 
-	for y in range(len(seq_b) + 1):
-		for x in range(len(seq_a) + 1):
-			d = collections.defaultdict(set)
+	sub, del_a, ins_b = costs[:3]
+	split, merge = costs[3:] if merges else (None, None)
+
+	lo, hi = band if band is not None else (-len_a, len_b)
+	prev_col, prev_prev_col = None, None
+
+	for y in range(len_b + 1):
+		col, back = [np.inf] * (len_a + 1), bytearray(len_a + 1)
+
+		rows = range(max(0, y - hi), min(len_a, y - lo) + 1)
+		COUNTERS['cells'] += len(rows)
+
+		for x in rows:
+			cands = []
 
 			if x > 0:
-				cost = matrix[(x-1, y)].cost + cost_func(seq_a[x-1], '')
-				d[cost].add('←')
+				cands.append((col[x-1] + del_a[x-1], LEFT))
 
 			if y > 0:
-				cost = matrix[(x, y-1)].cost + cost_func('', seq_b[y-1])
-				d[cost].add('↑')
+				cands.append((prev_col[x] + ins_b[y-1], UP))
 
 			if x > 0 and y > 0:
-				cost = matrix[(x-1, y-1)].cost + cost_func(seq_a[x-1], seq_b[y-1])
-				d[cost].add('.')
+				cost = prev_col[x-1] + sub[x-1][y-1]
+				cands.append((cost, DIAG))
 			elif x == 0 and y == 0:
-				d[0].add('.')
+				cands.append((0, DIAG))
 
-			cost = min(d.keys())
-			matrix[(x, y)] = MatrixCell(cost, frozenset(d[cost]))
+			if merges and x > 0 and y > 1:
+				cost = prev_prev_col[x-1] + split[x-1][y-2]
+				cands.append((cost, SPLIT))
 
-	return frozenset([
-		Alignment(cost, corr) for corr in backtrack(seq_a, seq_b, matrix) ])
+			if merges and x > 1 and y > 0:
+				cost = prev_col[x-2] + merge[x-2][y-1]
+				cands.append((cost, MERGE))
+
+			cost = min([cand for cand, _ in cands])
+			col[x] = cost
+			back[x] = sum([flag for cand, flag in cands if cand == cost])
+
+		matrix.cost[:, y] = col
+		matrix.back[:, y] = np.frombuffer(back, dtype=np.uint8)
+
+		prev_col, prev_prev_col = col, prev_col
 
+	return matrix, col[len_a]
 
 
-def merge_align(seq_a, seq_b, cost_func):
+
+def simple_align(seq_a, seq_b, cost_func, max_alignments=None):
+	"""
+	Align two sequences using the standard Needleman-Wunsch algorithm. The last
+	arg should be a elem_a, elem_b → float function; it should accept the empty
+	string as the value of either of its args, in which case the return value
+	can be seen as the respective indel penalty.
+
+	Return the alignments of minimum cost as a frozen set of Alignment tuples.
+	If max_alignments is set, return at most that many of these.
+	"""
+	matrix, cost = _fill(seq_a, seq_b, cost_func)
+
+	return _alignments(seq_a, seq_b, matrix, max_alignments, cost)
+
+
+
+def merge_align(seq_a, seq_b, cost_func, max_alignments=None):
 	"""
 	Align two sequences using the modified Needleman-Wunsch algorithm that also
 	includes merges and splits (horse movements on the matrix).
@@ -96,45 +310,1036 @@ def merge_align(seq_a, seq_b, cost_func):
 	handle tuples of elements as well.
 
 	Return the alignments of minimum cost as a frozen set of Alignment tuples.
+	If max_alignments is set, return at most that many of these.
 	"""
-	matrix = {}  # (x, y): MatrixCell
+	matrix, cost = _fill(seq_a, seq_b, cost_func, merges=True)
+
+	return _alignments(seq_a, seq_b, matrix, max_alignments, cost)
+
 
-	for y in range(len(seq_b) + 1):
-		for x in range(len(seq_a) + 1):
-			d = collections.defaultdict(set)
+
+"""
+The half-width of the initial band of the banded align funcs, i.e. by how many
+diagonals it extends beyond those between the two corners of the matrix.
+"""
+BAND_WIDTH = 1
+
+
+"""
+The length that both sequences should reach for the banded align funcs to
+fill only a band of the matrix; shorter ones are filled in full, as bounding
+the band costs more than the few cells left out of it would.
+"""
+BAND_MIN_LENGTH = 6
+
+
+
+def _move_bound(costs, half_a, half_b):
+	"""
+	Return (rest_a, rest_b, excess) such that any path from cell (x, y) of an
+	alignment matrix to its bottom-right cell costs at least rest_a[x] +
+	rest_b[y] plus the excess times the number of its moves that are not DIAG.
+	The costs should be as passed on to _fill.
+
+	The last two args should assign a share to each element of either
+	sequence, such that a DIAG move costs at least the sum of the shares of
+	its two elements; the other moves then cost at least the sum of the shares
+	of theirs plus the excess, and rest_a[x] and rest_b[y] are the sums of the
+	shares of the elements from x and y on. If the excess is not positive,
+	there is no bound on how far the optimal paths can get from the diagonal.
+
+	Helper for the _banded_fill and _cutoff_fill funcs.
+	"""
+	del_a, ins_b = costs[1:3]
+
+	excess = [cost - half for cost, half in zip(del_a, half_a)] \
+			+ [cost - half for cost, half in zip(ins_b, half_b)]
+
+	if len(costs) > 3:
+		split, merge = costs[3:]
+
+		excess += [cost - half_a[x] - half_b[y] - half_b[y+1]
+				for x, row in enumerate(split) for y, cost in enumerate(row)]
+		excess += [cost - half_a[x] - half_a[x+1] - half_b[y]
+				for x, row in enumerate(merge) for y, cost in enumerate(row)]
+
+	rest_a = list(itertools.accumulate(reversed(half_a)))[::-1] + [0]
+	rest_b = list(itertools.accumulate(reversed(half_b)))[::-1] + [0]
+
+	return rest_a, rest_b, min(excess)
+
+
+
+def _move_bounds(costs):
+	"""
+	Return the list of the (rest_a, rest_b, excess) tuples of _move_bound for
+	two ways of sharing the substitution costs: giving each element half the
+	least of its own substitution costs, which yields the larger shares, or
+	giving all elements half the least substitution cost, which yields the
+	larger excess.
+
+	Helper for the _banded_fill and _cutoff_fill funcs.
+	"""
+	sub = costs[0]
+
+	half_a = [min(row) / 2 for row in sub]
+	half_b = [min(col) / 2 for col in zip(*sub)]
+	least = min(half_a)
+
+	return [
+		_move_bound(costs, half_a, half_b),
+		_move_bound(costs, [least] * len(half_a), [least] * len(half_b))]
+
+
+
+def _band_width(bounds, cost, diff):
+	"""
+	Return the least band half-width that provably comprises all paths that
+	cost no more than the given cost, given the bounds of _move_bounds (those
+	with a positive excess) and the diagonal of the bottom-right cell.
+
+	A path that leaves a band of half-width w makes at least |diff| + 2(w + 1)
+	moves that are not DIAG (to the diagonal just outside the band, back, and
+	on to the bottom-right cell), and thus costs at least rest_a[0] +
+	rest_b[0] + (|diff| + 2(w + 1)) * excess; the band is wide enough once
+	that exceeds the given cost.
+
+	Helper for the _banded_fill func.
+	"""
+	widths = []
+
+	for rest_a, rest_b, excess in bounds:
+		# allow for rounding errors in the sums of float costs
+		least = ((cost - rest_a[0] - rest_b[0]) / excess - abs(diff)) / 2
+		widths.append(max(0, math.floor(least + 1e-6)))
+
+	return min(widths)
+
+
+
+def _banded_fill(seq_a, seq_b, cost_func, merges=False):
+	"""
+	Fill the cells of the alignment matrix of two sequences that lie within
+	a band around the diagonals between its top-left and bottom-right corners.
+	The band is widened until the bound of _band_width proves that each path
+	leaving it costs more than the best path found within it; at that point
+	the optimal paths, and hence the alignments, are the same as those of the
+	full matrix. Return the same as _fill.
+
+	As the best path found can only get cheaper as the band is widened, this
+	takes at most two passes: one with a band of BAND_WIDTH, and one with the
+	band that the cost of the best path found in the first pass calls for.
+	Matrices of sequences shorter than BAND_MIN_LENGTH are filled in full.
+
+	Helper for the banded align funcs.
+	"""
+	len_a, len_b = len(seq_a), len(seq_b)
+	diff = len_b - len_a
+
+	if min(len_a, len_b) < BAND_MIN_LENGTH:
+		return _fill(seq_a, seq_b, cost_func, merges)
+
+	costs = _cost_lists(seq_a, seq_b, cost_func)
+	if merges:
+		costs += _merge_cost_lists(seq_a, seq_b, cost_func)
+
+	bounds = []
+	if len_a and len_b:
+		bounds = [bound for bound in _move_bounds(costs) if bound[2] > 0]
+
+	width = BAND_WIDTH if bounds else max(len_a, len_b)
+
+	while True:
+		band = (min(0, diff) - width, max(0, diff) + width)
+		matrix, cost = _fill(seq_a, seq_b, cost_func, merges, band, costs)
+
+		if band[0] <= -len_a and band[1] >= len_b:
+			return matrix, cost
+
+		needed = _band_width(bounds, cost, diff)
+		if needed <= width:
+			return matrix, cost
+
+		width = needed
+
+
+
+def banded_align(seq_a, seq_b, cost_func, max_alignments=None):
+	"""
+	Align two sequences using the standard Needleman-Wunsch algorithm, only
+	filling a band of the matrix around its diagonal; the band is widened
+	until it provably comprises the optimal paths.
+
+	The results are the same as those of simple_align.
+	"""
+	matrix, cost = _banded_fill(seq_a, seq_b, cost_func)
+
+	return _alignments(seq_a, seq_b, matrix, max_alignments, cost)
+
+
+
+def banded_merge_align(seq_a, seq_b, cost_func, max_alignments=None):
+	"""
+	Align two sequences using the modified Needleman-Wunsch algorithm that also
+	includes merges and splits, only filling a band of the matrix around its
+	diagonal. The cost func is still called on all pairs of elements, as the
+	bound on the band depends on the least of the costs.
+
+	The results are the same as those of merge_align.
+	"""
+	matrix, cost = _banded_fill(seq_a, seq_b, cost_func, merges=True)
+
+	return _alignments(seq_a, seq_b, matrix, max_alignments, cost)
+
+
+
+"""
+The tolerance for rounding errors when comparing a lower bound on the cost of
+an alignment with a max cost; see the cutoff funcs.
+"""
+CUTOFF_TOLERANCE = 1e-9
+
+
+
+def get_length_bound(cost_func):
+	"""
+	Return a len_a, len_b → float function that yields a lower bound on the
+	cost of aligning any two sequences of these lengths using the standard
+	Needleman-Wunsch algorithm, based on the least substitution and indel costs
+	of the cost func. The latter should be a CostMatrix and the sequences
+	should only comprise phonemes of its inventories; for other cost funcs,
+	whose costs are not known in advance, return None.
+	"""
+	if not isinstance(cost_func, CostMatrix) or not cost_func.sub.size:
+		return None
+
+	half = cost_func.sub.min().item() / 2
+	excess = min(cost_func.indel_a.min(), cost_func.indel_b.min()).item() - half
+
+	def length_bound(len_a, len_b):
+		"""
+		Each of the len_a + len_b elements costs at least half the least
+		substitution cost, and each indel costs at least the excess on top
+		of that; there are at least |len_b - len_a| indels (and at most all
+		of the elements can be indels, which matters if the excess is not
+		positive).
+		"""
+		num_indels = abs(len_b - len_a) if excess > 0 else len_a + len_b
+		return (len_a + len_b) * half + num_indels * excess
+
+	return length_bound
+
+
+
+"""
+The editdistance function that checks whether the distance is within a given
+limit, stopping as soon as it is not; None if the installed version lacks it.
+"""
+_EVAL_CRITERION = getattr(editdistance, 'eval_criterion', None)
+
+
+
+def within_distance(seq_a, seq_b, max_dist):
+	"""
+	Return whether the Levenshtein distance between two sequences is at most
+	max_dist, as computed by the editdistance package. If the installed
+	version of the latter has eval_criterion, the distance is not computed in
+	full.
+	"""
+	if abs(len(seq_a) - len(seq_b)) > max_dist:
+		return False
+
+	if max_dist >= max(len(seq_a), len(seq_b)):
+		return True
+
+	# eval_criterion does not handle a max distance of 0
+	if max_dist >= 1 and _EVAL_CRITERION is not None:
+		return _EVAL_CRITERION(seq_a, seq_b, max_dist)
+
+	return editdistance.eval(seq_a, seq_b) <= max_dist
+
+
+
+def _cutoff_fill(seq_a, seq_b, cost_func, max_cost):
+	"""
+	Fill the alignment matrix of two sequences column by column, as _fill does
+	for the standard Needleman-Wunsch algorithm, but leave out the cells that
+	cannot be on a path costing no more than max_cost: a cell is dropped if its
+	cost plus the bounds of _move_bounds on the rest of the path exceed the
+	latter. The paths of at most max_cost, and hence the alignments, are the
+	same as those of the full matrix.
+
+	Return the same as _fill or, as soon as a whole column is dropped or if the
+	bottom-right cell costs more than max_cost, None.
+
+	Helper for the cutoff funcs.
+	"""
+	len_a, len_b = len(seq_a), len(seq_b)
+	matrix = Matrix.blank(len_a, len_b)
+
+	costs = _cost_lists(seq_a, seq_b, cost_func)
+	sub, del_a, ins_b = costs
+
+	bounds = _move_bounds(costs) if len_a and len_b else []
+	limit = max_cost + CUTOFF_TOLERANCE * max(1, abs(max_cost))
+
+	prev_col, first, last = None, 0, 0
+
+	for y in range(len_b + 1):
+		col, back = [np.inf] * (len_a + 1), bytearray(len_a + 1)
+		live = []
+
+		for x in range(first, len_a + 1):
+			if x > last + 1 and col[x-1] == np.inf:
+				break
+
+			cands = []
 
 			if x > 0:
-				cost = matrix[(x-1, y)].cost + cost_func(seq_a[x-1], '')
-				d[cost].add('←')
+				cands.append((col[x-1] + del_a[x-1], LEFT))
 
 			if y > 0:
-				cost = matrix[(x, y-1)].cost + cost_func('', seq_b[y-1])
-				d[cost].add('↑')
+				cands.append((prev_col[x] + ins_b[y-1], UP))
 
 			if x > 0 and y > 0:
-				cost = matrix[(x-1, y-1)].cost + cost_func(seq_a[x-1], seq_b[y-1])
-				d[cost].add('.')
+				cands.append((prev_col[x-1] + sub[x-1][y-1], DIAG))
 			elif x == 0 and y == 0:
-				d[0].add('.')
+				cands.append((0, DIAG))
 
-			if x > 0 and y > 1:
-				cost = matrix[(x-1, y-2)].cost + cost_func(seq_a[x-1], seq_b[y-2:y])
-				d[cost].add('←↑↑')
+			cost = min([cand for cand, _ in cands])
 
-			if x > 1 and y > 0:
-				cost = matrix[(x-2, y-1)].cost + cost_func(seq_a[x-2:x], seq_b[y-1])
-				d[cost].add('←←↑')
+			if cost == np.inf or any([
+					cost + rest_a[x] + rest_b[y] + excess * (
+						abs(len_b - len_a - y + x) if excess > 0
+						else len_a - x + len_b - y) > limit
+					for rest_a, rest_b, excess in bounds]):
+				continue
 
-			cost = min(d.keys())
-			matrix[(x, y)] = MatrixCell(cost, frozenset(d[cost]))
+			col[x] = cost
+			back[x] = sum([flag for cand, flag in cands if cand == cost])
+			live.append(x)
+
+		COUNTERS['cells'] += len(live)
+
+		if not live:
+			return None
+
+		matrix.cost[:, y] = col
+		matrix.back[:, y] = np.frombuffer(back, dtype=np.uint8)
+
+		prev_col, first, last = col, live[0], live[-1]
+
+	if col[len_a] > max_cost:
+		return None
+
+	return matrix, col[len_a]
+
+
+
+def cutoff_align(seq_a, seq_b, cost_func, max_cost, max_alignments=None):
+	"""
+	Align two sequences using the standard Needleman-Wunsch algorithm, unless
+	their alignments cost more than max_cost, in which case return an empty
+	frozen set; the matrix is only filled as far as such alignments are still
+	possible, so the pairs that are far apart are given up on early.
+
+	Otherwise the results are the same as those of simple_align.
+	"""
+	res = _cutoff_fill(seq_a, seq_b, cost_func, max_cost)
+
+	if res is None:
+		return frozenset()
+
+	matrix, cost = res
+
+	return _alignments(seq_a, seq_b, matrix, max_alignments, cost)
 
-	return frozenset([
-		Alignment(cost, corr) for corr in backtrack(seq_a, seq_b, matrix) ])
 
 
+def cutoff_score(seq_a, seq_b, cost_func, max_cost):
+	"""
+	Return the cost of the optimal alignment(s) of two sequences, as found by
+	the standard Needleman-Wunsch algorithm, or None if that is more than
+	max_cost; see cutoff_align.
+	"""
+	res = _cutoff_fill(seq_a, seq_b, cost_func, max_cost)
+
+	return None if res is None else res[1]
+
+
+
+def cutoff_score_align(seq_a, seq_b, cost_func, max_cost, max_alignments=None):
+	"""
+	Return the same as score_align or, if the cost of the optimal alignment(s)
+	of the two sequences is more than max_cost, an empty frozen set.
+	"""
+	cost = cutoff_score(seq_a, seq_b, cost_func, max_cost)
+
+	if cost is None:
+		return frozenset()
+
+	return frozenset([Alignment(cost, None)])
+
+
+
+def _word_costs(seq_a, seq_b, cost_func, merges=False):
+	"""
+	Precompute the costs of the moves needed for aligning two sequences. Return
+	a {flag: 2d array} dict where the cost of moving into cell (x, y) is found
+	at [x-dx, y-dy] of the respective array.
+
+	Helper for the wavefront align funcs.
+	"""
+	len_a, len_b = len(seq_a), len(seq_b)
+
+	sub, del_a, ins_b = _cost_lists(seq_a, seq_b, cost_func)
+
+	sub = np.array(sub, dtype=float).reshape(len_a, len_b)
+	del_a, ins_b = np.array(del_a, dtype=float), np.array(ins_b, dtype=float)
+
+	costs = {
+		DIAG: sub,
+		LEFT: np.broadcast_to(del_a[:, None], (len_a, len_b + 1)),
+		UP: np.broadcast_to(ins_b[None, :], (len_a + 1, len_b)) }
+
+	if merges:
+		split, merge = _merge_cost_lists(seq_a, seq_b, cost_func)
+
+		costs[SPLIT] = np.array(split, dtype=float).reshape(
+				len_a, max(len_b - 1, 0))
+		costs[MERGE] = np.array(merge, dtype=float).reshape(
+				max(len_a - 1, 0), len_b)
+
+	return costs
+
+
+
+def _batch_fill(costs, size, len_a, len_b, merges=False):
+	"""
+	Fill a stack of alignment matrices one anti-diagonal at a time: the cells
+	on the diagonal x+y = d only depend on cells on the preceding diagonals, so
+	each diagonal of all the matrices can be computed as a single numpy
+	operation. The costs should be a {flag: 3d array} dict as returned by
+	_word_costs, with an extra leading axis for the matrices in the stack.
+
+	Return the 3d arrays of the cell costs and of the backpointers.
+
+	Helper for the wavefront and batch align funcs.
+	"""
+	moves = MOVES if merges else MOVES[:3]
+	height, width = len_a + 1, len_b + 1
+
+	# the cells are kept along the first axis and looked up by their flat
+	# indices, which numpy handles much faster than index arrays along the
+	# other axes; the stack of matrices is along the last axis
+	#
+	# the cost of moving into cell (x, y) is moved to that cell's index, and
+	# the moves that would start outside the matrix cost infinity; thus the
+	# indices of the cells they would start at can be left to wrap around, onto
+	# the padding rows at the end if the matrix is smaller than a move
+	move_costs = []
+
+	for flag, dx, dy in moves:
+		move_cost = np.full((height, width, size), np.inf)
+		move_cost[dx:, dy:] = np.moveaxis(costs[flag], 0, -1)
+		move_costs.append((flag, dx * width + dy, move_cost.reshape(-1, size)))
+
+	padding = max([offset for _, offset, _ in move_costs])
+
+	cost = np.full((height * width + padding, size), np.inf)
+	back = np.zeros((height * width, size), dtype=np.uint8)
+	cost[0], back[0] = 0, DIAG
+
+	COUNTERS['cells'] += size * height * width
+
+	for d in range(1, len_a + len_b + 1):
+		x = np.arange(max(0, d - len_b), min(len_a, d) + 1)
+		cells = x * width + (d - x)
+
+		cands = [cost[cells - offset] + move_cost[cells]
+				for _, offset, move_cost in move_costs]
+
+		best = np.minimum.reduce(cands)
+		cost[cells] = best
+		back[cells] = sum([
+			np.where(cand == best, flag, 0)
+			for (flag, _, _), cand in zip(move_costs, cands)])
+
+	return cost[:height*width].T.reshape(size, height, width), \
+			back.T.reshape(size, height, width)
+
+
+
+def _wavefront(seq_a, seq_b, cost_func, merges=False):
+	"""
+	Fill the alignment matrix of two sequences along its anti-diagonals, as a
+	stack of a single matrix. Return the Matrix instance.
+	"""
+	costs = _word_costs(seq_a, seq_b, cost_func, merges)
+
+	cost, back = _batch_fill(
+			{flag: array[None] for flag, array in costs.items()},
+			1, len(seq_a), len(seq_b), merges)
+
+	return Matrix(cost[0], back[0])
+
+
+
+def wavefront_align(seq_a, seq_b, cost_func, max_alignments=None):
+	"""
+	Align two sequences using the standard Needleman-Wunsch algorithm, filling
+	the matrix along its anti-diagonals with numpy arrays. The cost func is
+	called once per pair of elements (and once per indel) to precompute the
+	costs for the two sequences.
+
+	The results are the same as those of simple_align.
+	"""
+	matrix = _wavefront(seq_a, seq_b, cost_func)
+
+	return _alignments(seq_a, seq_b, matrix, max_alignments)
+
+
+
+def wavefront_merge_align(seq_a, seq_b, cost_func, max_alignments=None):
+	"""
+	Align two sequences using the modified Needleman-Wunsch algorithm that also
+	includes merges and splits, filling the matrix along its anti-diagonals
+	with numpy arrays.
+
+	The results are the same as those of merge_align.
+	"""
+	matrix = _wavefront(seq_a, seq_b, cost_func, merges=True)
+
+	return _alignments(seq_a, seq_b, matrix, max_alignments)
+
+
+
+def _last_col(seq_a, seq_b, cost_func):
+	"""
+	Compute the alignment matrix of two sequences column by column, keeping
+	only the current and the previous column. Return the last one, i.e. the
+	list of the costs of aligning seq_b against each prefix of seq_a.
+
+	Helper for the simple_score and hirschberg_align funcs.
+	"""
+	del_a, cost_cols = _cost_cols(seq_a, seq_b, cost_func)
+	COUNTERS['cells'] += (len(seq_a) + 1) * (len(seq_b) + 1)
+
+	col = [0]
+	for x in range(1, len(seq_a) + 1):
+		col.append(col[x-1] + del_a[x-1])
+
+	for sub, ins in cost_cols:
+		prev_col = col
+		col = [prev_col[0] + ins]
+
+		for x in range(1, len(seq_a) + 1):
+			col.append(min(
+				col[x-1] + del_a[x-1],
+				prev_col[x] + ins,
+				prev_col[x-1] + sub[x-1]))
+
+	return col
+
+
+
+def simple_score(seq_a, seq_b, cost_func):
+	"""
+	Return the cost of the optimal alignment(s) of two sequences, as found by
+	the standard Needleman-Wunsch algorithm, without building the alignments
+	themselves; uses memory linear to the length of seq_a.
+	"""
+	return _last_col(seq_a, seq_b, cost_func)[-1]
+
+
+
+def _hirschberg(seq_a, seq_b, cost_func):
+	"""
+	Recursively find an optimal alignment of two sequences using Hirschberg's
+	divide-and-conquer algorithm: seq_b is split in two halves and seq_a is
+	split where the sum of the costs of the forward and the backward passes is
+	minimal. Return the tuple of corresponding sequence elements.
+
+	Helper for the hirschberg_align func.
+	"""
+	if len(seq_b) == 0:
+		return tuple([(elem_a, '') for elem_a in seq_a])
+
+	if len(seq_a) == 0:
+		return tuple([('', elem_b) for elem_b in seq_b])
+
+	if len(seq_b) == 1:
+		matrix, _ = _fill(seq_a, seq_b, cost_func)
+		return next(iter_backtrack(seq_a, seq_b, matrix))
+
+	mid = len(seq_b) // 2
+
+	col_f = _last_col(seq_a, seq_b[:mid], cost_func)
+	col_r = _last_col(seq_a[::-1], seq_b[mid:][::-1], cost_func)
+
+	len_a = len(seq_a)
+	split = min(range(len_a + 1), key=lambda x: col_f[x] + col_r[len_a - x])
+
+	return _hirschberg(seq_a[:split], seq_b[:mid], cost_func) \
+			+ _hirschberg(seq_a[split:], seq_b[mid:], cost_func)
+
+
+
+def hirschberg_align(seq_a, seq_b, cost_func, max_alignments=None):
+	"""
+	Align two sequences using Hirschberg's linear-memory variant of the
+	standard Needleman-Wunsch algorithm. Return a frozen set comprising a
+	single Alignment tuple, one of those that simple_align would return; the
+	last arg is there for compatibility with the other align funcs.
+	"""
+	corr = _hirschberg(seq_a, seq_b, cost_func)
+
+	cost = 0
+	for elem_a, elem_b in corr:
+		cost += cost_func(elem_a, elem_b)
+
+	COUNTERS['costs'] += len(corr)
+
+	return frozenset([Alignment(cost, corr)])
+
+
+
+def score_align(seq_a, seq_b, cost_func, max_alignments=None):
+	"""
+	Return a frozen set comprising a single Alignment tuple with the cost of
+	the optimal alignment(s) of two sequences and None instead of the tuple of
+	corresponding elements. The last arg is there for compatibility with the
+	other align funcs.
+	"""
+	return frozenset([Alignment(simple_score(seq_a, seq_b, cost_func), None)])
+
+
+
+def _encode_batch(pairs, cost_func):
+	"""
+	Intern the elements of the sequences of a batch of pairs and encode the
+	latter as two 2d int arrays, padded with zeroes. Return these and the 2d
+	array of costs between the interned elements of either side; the 0th row
+	and column are reserved for the empty string (i.e. indels).
+
+	If the cost func is a CostMatrix covering all the elements, its ids and
+	table are used directly.
+
+	Helper for the _batch_align func.
+	"""
+	if isinstance(cost_func, CostMatrix):
+		try:
+			enc = [(cost_func.encode_a(seq_a), cost_func.encode_b(seq_b))
+					for seq_a, seq_b in pairs]
+		except (KeyError, TypeError):
+			pass
+		else:
+			enc_a = np.zeros((len(pairs), max([len(a) for a, _ in enc])), dtype=np.intp)
+			enc_b = np.zeros((len(pairs), max([len(b) for _, b in enc])), dtype=np.intp)
+
+			for index, (ix_a, ix_b) in enumerate(enc):
+				enc_a[index, :len(ix_a)] = ix_a
+				enc_b[index, :len(ix_b)] = ix_b
+
+			return enc_a, enc_b, cost_func.table
+
+	ids_a, ids_b = {'': 0}, {'': 0}
+
+	for seq_a, seq_b in pairs:
+		for elem in seq_a:
+			ids_a.setdefault(elem, len(ids_a))
+		for elem in seq_b:
+			ids_b.setdefault(elem, len(ids_b))
+
+	max_a = max([len(seq_a) for seq_a, _ in pairs])
+	max_b = max([len(seq_b) for _, seq_b in pairs])
+
+	enc_a = np.zeros((len(pairs), max_a), dtype=np.intp)
+	enc_b = np.zeros((len(pairs), max_b), dtype=np.intp)
+
+	for index, (seq_a, seq_b) in enumerate(pairs):
+		enc_a[index, :len(seq_a)] = [ids_a[elem] for elem in seq_a]
+		enc_b[index, :len(seq_b)] = [ids_b[elem] for elem in seq_b]
+
+	table = np.array([
+		cost_func(elem_a, elem_b) if elem_a or elem_b else 0
+		for elem_a in ids_a for elem_b in ids_b
+	], dtype=float).reshape(len(ids_a), len(ids_b))
+
+	if any([elem == '' for seq_a, _ in pairs for elem in seq_a]) \
+			and any([elem == '' for _, seq_b in pairs for elem in seq_b]):
+		table[0, 0] = cost_func('', '')
+
+	return enc_a, enc_b, table
+
+
+
+def _batch_align(pairs, cost_func, merges=False, max_alignments=None):
+	"""
+	Align a batch of (seq_a, seq_b) pairs at once: the sequences are encoded
+	into padded int arrays and the alignment matrices are stacked into 3d
+	arrays, which are then filled along their anti-diagonals for all pairs at
+	the same time. The padding cells are never reached when backtracking.
+
+	Return the list of frozen sets of Alignment tuples, in the pairs' order.
+	"""
+	if not pairs:
+		return []
+
+	enc_a, enc_b, table = _encode_batch(pairs, cost_func)
+	size, len_a, len_b = len(pairs), enc_a.shape[1], enc_b.shape[1]
+
+	# the costs of the padded matrices are fetched in full
+	COUNTERS['costs'] += size * ((len_a + 1) * (len_b + 1) - 1)
+
+	costs = {
+		DIAG: table[enc_a[:, :, None], enc_b[:, None, :]],
+		LEFT: np.broadcast_to(
+				table[enc_a, 0][:, :, None], (size, len_a, len_b + 1)),
+		UP: np.broadcast_to(
+				table[0, enc_b][:, None, :], (size, len_a + 1, len_b)) }
+
+	if merges:
+		costs[SPLIT] = np.zeros((size, len_a, max(len_b - 1, 0)))
+		costs[MERGE] = np.zeros((size, max(len_a - 1, 0), len_b))
+
+		for index, (seq_a, seq_b) in enumerate(pairs):
+			COUNTERS['costs'] += len(seq_a) * max(len(seq_b) - 1, 0) \
+								+ max(len(seq_a) - 1, 0) * len(seq_b)
+
+			for x, y in itertools.product(
+					range(len(seq_a)), range(len(seq_b) - 1)):
+				costs[SPLIT][index, x, y] = cost_func(seq_a[x], seq_b[y:y+2])
+
+			for x, y in itertools.product(
+					range(len(seq_a) - 1), range(len(seq_b))):
+				costs[MERGE][index, x, y] = cost_func(seq_a[x:x+2], seq_b[y])
+
+	cost, back = _batch_fill(costs, size, len_a, len_b, merges)
+
+	return [
+		_alignments(seq_a, seq_b, Matrix(
+			cost[index, :len(seq_a)+1, :len(seq_b)+1],
+			back[index, :len(seq_a)+1, :len(seq_b)+1]), max_alignments)
+		for index, (seq_a, seq_b) in enumerate(pairs)]
+
+
+
+def batch_simple_align(pairs, cost_func, max_alignments=None):
+	"""
+	Align a list of (seq_a, seq_b) pairs using the standard Needleman-Wunsch
+	algorithm, vectorised over the whole batch. Return the list of frozen sets
+	of Alignment tuples, i.e. the same as calling simple_align on each pair.
+	"""
+	return _batch_align(pairs, cost_func, False, max_alignments)
+
+
+
+def batch_merge_align(pairs, cost_func, max_alignments=None):
+	"""
+	Align a list of (seq_a, seq_b) pairs using the modified Needleman-Wunsch
+	algorithm that also includes merges and splits, vectorised over the whole
+	batch. Return the same as calling merge_align on each pair.
+	"""
+	return _batch_align(pairs, cost_func, True, max_alignments)
+
+
+
+"""
+Batches of fewer pairs than this are aligned (or scored) pair by pair, as the
+fixed costs of setting up the bit-parallel engine would outweigh its speed.
+"""
+BITPARALLEL_MIN_BATCH = 8
+
+
+"""
+Number of bits of each of the fields that the packed ints of the bit-parallel
+engine are divided into; each field holds the cost of a single cell.
+"""
+FIELD_BITS = 16
+
+
+
+def get_unit_costs(cost_func):
+	"""
+	If the cost func is a CostMatrix of a unit cost model that the bit-parallel
+	engine can handle, return its (match, mismatch, indel) tuple of costs;
+	otherwise return None.
+
+	The engine requires integer costs, with mismatches not costing less than
+	matches, and two indels not costing less than a match.
+	"""
+	unit_costs = getattr(cost_func, 'unit_costs', None)
+
+	if unit_costs is None:
+		return None
+
+	match, mismatch, indel = unit_costs
+
+	if not all([cost == int(cost) for cost in unit_costs]) \
+			or mismatch < match or 2 * indel < match:
+		return None
+
+	return int(match), int(mismatch), int(indel)
+
+
+
+def _pack(fields):
+	"""
+	Pack an array of non-negative ints less than 2**FIELD_BITS into a python
+	int, with the first element in the lowest field.
+	"""
+	return int.from_bytes(
+			np.ascontiguousarray(fields, dtype='<u2').tobytes(), 'little')
+
+
+
+def _unpack(packed, num_fields):
+	"""
+	Unpack a python int into a 1d array of that many fields; the inverse of
+	_pack.
+	"""
+	return np.frombuffer(packed.to_bytes(2 * num_fields, 'little'), dtype='<u2')
+
+
+
+def _packed_min(packed_a, packed_b, high, full):
+	"""
+	Return the field-wise minimum of two packed ints, the fields of which
+	should be less than 2**(FIELD_BITS-1). The other two args should be the
+	ints with the top bit of each field set and with all the bits set.
+	"""
+	k = FIELD_BITS
+
+	# the top bit of each field of a|high - b is set iff a >= b, and no field
+	# borrows from the next one
+	geq = (((packed_a | high) - packed_b) & high) >> (k - 1)
+	mask = geq * ((1 << k) - 1)
+
+	return (packed_b & mask) | (packed_a & (full ^ mask))
+
+
+
+def _bitparallel_fill(pairs, cost_func, unit_costs):
+	"""
+	Compute the alignment matrices of a batch of (seq_a, seq_b) pairs under a
+	unit cost model, holding each anti-diagonal of all the matrices in a single
+	python int. The int is divided into FIELD_BITS-wide fields, one per cell,
+	and the recurrence is evaluated on all the fields at once using SWAR (SIMD
+	within a register) arithmetic, so that a whole diagonal of the batch costs
+	a dozen big-int operations.
+
+	In order to keep the fields non-negative, the cost of cell (x, y) is stored
+	as 2 * cost - match * (x + y), which preserves the optimal paths: matches
+	then cost 0, mismatches 2 * (mismatch - match), and indels 2 * indel -
+	match.
+
+	Return the list of the packed diagonals, the number of fields per pair,
+	and the 2d arrays of the interned elements of either side; or None if the
+	pairs cannot be encoded or their costs would not fit into the fields.
+
+	Helper for the bitparallel align funcs.
+	"""
+	match, mismatch, indel = unit_costs
+
+	tokens = sorted(set(cost_func.tokens_a) | set(cost_func.tokens_b))
+	joint = {token: index for index, token in enumerate(tokens, 1)}
+
+	joint_a = {token: joint[token] for token in cost_func.tokens_a}
+	joint_b = {token: joint[token] for token in cost_func.tokens_b}
+
+	k = FIELD_BITS
+	inf = 1 << (k - 2)
+
+	w_sub, w_indel = 2 * (mismatch - match), 2 * indel - match
+
+	size = len(pairs)
+	len_a = max([len(seq_a) for seq_a, _ in pairs])
+	len_b = max([len(seq_b) for _, seq_b in pairs])
+
+	if (len_a + len_b + 1) * max(w_sub, w_indel) >= inf \
+			or len(tokens) >= 1 << (k - 1):
+		return None
+
+	# each pair gets a lane of fields, one per x and one more that is always
+	# infinite, so that shifting a diagonal does not leak into the next lane
+	width = len_a + 2
+
+	try:
+		ids_a = np.array([
+			[0] + [joint_a[elem] for elem in seq_a]
+			+ [0] * (width - len(seq_a) - 1)
+			for seq_a, _ in pairs], dtype=np.intp)
+		ids_b = np.array([
+			[0] * width + [joint_b[elem] for elem in seq_b]
+			+ [0] * (len_a + len_b - len(seq_b))
+			for _, seq_b in pairs], dtype=np.intp)
+	except (KeyError, TypeError):
+		return None
+
+	lens_a = np.array([len(seq_a) for seq_a, _ in pairs])[:, None]
+	lens_b = np.array([len(seq_b) for _, seq_b in pairs])[:, None]
+
+	# the padded matrices are filled in full
+	COUNTERS['cells'] += size * (len_a + 1) * (len_b + 1)
+
+	num_diags = len_a + len_b + 1
+	num_bytes = 2 * size * width
+
+	# field x of diagonal d holds cell (x, d-x); the masks of the valid cells
+	# and the elements of seq_b to compare against are packed for all the
+	# diagonals at once, each taking num_bytes of the respective buffer
+	d, x = np.arange(num_diags)[:, None], np.arange(width)[None, :]
+	valid = (x <= lens_a[None]) & (x <= d[:, None]) \
+			& (d[:, None] - x <= lens_b[None])
+
+	masks = np.where(valid, (1 << k) - 1, 0).astype('<u2').tobytes()
+	elems = ids_b[:, width + d - 1 - x].transpose(1, 0, 2).astype('<u2').tobytes()
+
+	ones = _pack(np.ones(size * width))
+	high = ones << (k - 1)
+	full = (1 << (k * size * width)) - 1
+
+	packed_a = _pack(ids_a)
+	packed_inf = ones * inf
+	packed_indel = ones * w_indel
+
+	diags = [_pack(np.where(x == 0, 0, inf).repeat(size, axis=0))]
+
+	for d in range(1, num_diags):
+		mask = int.from_bytes(masks[d*num_bytes:(d+1)*num_bytes], 'little')
+
+		# shifting a diagonal by one field moves the cell (x, y) to field x+1;
+		# the lowest field is then filled with infinity
+		prev = diags[d-1]
+		best = _packed_min(
+				(((prev << k) | inf) & full) + packed_indel,
+				prev + packed_indel, high, full)
+
+		if d > 1:
+			packed_b = int.from_bytes(
+					elems[d*num_bytes:(d+1)*num_bytes], 'little')
+			diff = ((((packed_a ^ packed_b) | high) - ones) & high) >> (k - 1)
+			best = _packed_min(best,
+					(((diags[d-2] << k) | inf) & full) + diff * w_sub, high, full)
+
+		diags.append((best & mask) | (packed_inf & (full ^ mask)))
+
+	return diags, width, ids_a[:, 1:len_a+1], ids_b[:, width:width+len_b]
+
+
+
+def bitparallel_score(pairs, cost_func, max_alignments=None):
+	"""
+	Return the costs of the optimal alignments of a list of (seq_a, seq_b)
+	pairs under a unit cost model (see get_unit_costs), computed by the
+	bit-parallel engine. Return the same as calling score_align on each pair,
+	which is also what this falls back to for cost funcs that are not unit
+	cost models and for small batches.
+	"""
+	if not pairs:
+		return []
+
+	unit_costs = get_unit_costs(cost_func)
+
+	if unit_costs and len(pairs) >= BITPARALLEL_MIN_BATCH:
+		res = _bitparallel_fill(pairs, cost_func, unit_costs)
+	else:
+		res = None
+
+	if res is None:
+		return [score_align(seq_a, seq_b, cost_func) for seq_a, seq_b in pairs]
+
+	diags, width, _, _ = res
+
+	lens_a = np.array([len(seq_a) for seq_a, _ in pairs])
+	lens_d = lens_a + np.array([len(seq_b) for _, seq_b in pairs])
+
+	values = np.zeros(len(pairs), dtype=np.int64)
+
+	for d in set(lens_d.tolist()):
+		diag = _unpack(diags[d], len(pairs) * width).reshape(len(pairs), width)
+		indices = np.flatnonzero(lens_d == d)
+		values[indices] = diag[indices, lens_a[indices]]
+
+	scores = (values + unit_costs[0] * lens_d) / 2
+
+	return [frozenset([Alignment(score, None)]) for score in scores.tolist()]
+
+
+
+def bitparallel_align(pairs, cost_func, max_alignments=None):
+	"""
+	Align a list of (seq_a, seq_b) pairs under a unit cost model (see
+	get_unit_costs) using the standard Needleman-Wunsch algorithm, computed by
+	the bit-parallel engine; the backpointers are only derived from the costs
+	afterwards. Return the same as batch_simple_align, which is also what this
+	falls back to for cost funcs that are not unit cost models.
+
+	Unlike bitparallel_score, align_pairs() does not use this in place of
+	simple_align, as recovering the backpointers takes away its edge over
+	batch_simple_align (see UNIT_COST_FUNCS).
+	"""
+	if not pairs:
+		return []
+
+	unit_costs = get_unit_costs(cost_func)
+	res = _bitparallel_fill(pairs, cost_func, unit_costs) if unit_costs else None
+
+	if res is None:
+		return batch_simple_align(pairs, cost_func, max_alignments)
+
+	diags, width, ids_a, ids_b = res
+	match, mismatch, indel = unit_costs
+
+	size, len_a, len_b = len(pairs), ids_a.shape[1], ids_b.shape[1]
+
+	stacked = np.stack([_unpack(diag, size * width).reshape(size, width)
+						for diag in diags]).astype(np.int64)
+
+	x, y = np.meshgrid(
+			np.arange(len_a + 1), np.arange(len_b + 1), indexing='ij')
+	cost = np.moveaxis(stacked[x + y, :, x], -1, 0)
+
+	w_sub = np.where(ids_a[:, :, None] == ids_b[:, None, :],
+					0, 2 * (mismatch - match))
+	w_indel = 2 * indel - match
+
+	# a move is flagged if it reaches the cell at the latter's cost
+	is_diag = cost[:, :-1, :-1] + w_sub == cost[:, 1:, 1:]
+	is_left = cost[:, :-1, :] + w_indel == cost[:, 1:, :]
+	is_up = cost[:, :, :-1] + w_indel == cost[:, :, 1:]
+
+	back = np.zeros(cost.shape, dtype=np.uint8)
+	back[:, 1:, 1:] |= np.uint8(DIAG) * is_diag
+	back[:, 1:, :] |= np.uint8(LEFT) * is_left
+	back[:, :, 1:] |= np.uint8(UP) * is_up
+	back[:, 0, 0] = DIAG
+
+	cost = (cost + match * (x + y)) / 2
+
+	return [
+		_alignments(seq_a, seq_b, Matrix(
+			cost[index, :len(seq_a)+1, :len(seq_b)+1],
+			back[index, :len(seq_a)+1, :len(seq_b)+1]), max_alignments)
+		for index, (seq_a, seq_b) in enumerate(pairs)]
+
 
 ALGORITHMS = {
-	'standard': simple_align }
+	'standard': simple_align,
+	'merge': merge_align,
+	'wavefront': wavefront_align,
+	'wavefront-merge': wavefront_merge_align,
+	'banded': banded_align,
+	'banded-merge': banded_merge_align,
+	'hirschberg': hirschberg_align,
+	'score': score_align }
+
+
+"""
+The algorithms that only output the alignment costs; see score_align().
+"""
+SCORE_ALGORITHMS = ['score']
 
 
 def list_algorithms():
@@ -143,3 +1348,89 @@ def list_algorithms():
 
 def get_align_func(algo_name):
 	return ALGORITHMS[algo_name]
+
+
+"""
+Mapping from align funcs to their batch counterparts; used in align_pairs().
+"""
+BATCH_FUNCS = {
+	simple_align: batch_simple_align,
+	merge_align: batch_merge_align }
+
+
+"""
+Lists of fewer pairs than this are aligned pair by pair in align_pairs(), as
+the fixed costs of setting up the batch arrays would outweigh their speed.
+"""
+BATCH_MIN_SIZE = 16
+
+
+"""
+Mapping from align funcs to their bit-parallel counterparts, which are used in
+align_pairs() instead of these for unit cost models (see get_unit_costs).
+
+Only the score-only func is routed: on the first 1000 word pairs of each of
+the bdpa and svmcc datasets with one-hot costs, bitparallel_score takes 0.54s
+against 0.72s for score_align (up to 3.6x less on the svmcc ones), while
+bitparallel_align takes 1.56s against 1.67s for batch_simple_align and is the
+slower of the two on a third of the datasets. See the --engines option of
+scripts/benchmark.py.
+"""
+UNIT_COST_FUNCS = {
+	score_align: bitparallel_score }
+
+
+"""
+Mapping from align funcs to their cutoff counterparts, which are used in
+align_pairs() instead of these if there is a max cost.
+"""
+CUTOFF_FUNCS = {
+	simple_align: cutoff_align,
+	banded_align: cutoff_align,
+	score_align: cutoff_score_align }
+
+
+def align_pairs(pairs, align_func, cost_func, max_cost=None):
+	"""
+	Align a list of (seq_a, seq_b) pairs using the given align func (which can
+	be a functools.partial of one) and return the list of the respective
+	frozen sets of Alignment tuples. If the func has a bit-parallel (for unit
+	cost models) or a batch counterpart and the list is long enough for that
+	to pay off, the whole list is aligned at once.
+
+	If a max cost is given, the alignments that cost more are left out, so
+	some of the sets can be empty. If the func has a cutoff counterpart, the
+	pairs that cannot be aligned within the max cost given their lengths are
+	skipped and the rest are only aligned as far as they still can be.
+	"""
+	COUNTERS['pairs'] += len(pairs)
+
+	func, kwargs = align_func, {}
+
+	if isinstance(align_func, functools.partial) and not align_func.args:
+		func, kwargs = align_func.func, align_func.keywords
+
+	if max_cost is not None and func in CUTOFF_FUNCS:
+		length_bound = get_length_bound(cost_func)
+		limit = max_cost + CUTOFF_TOLERANCE * max(1, abs(max_cost))
+
+		return [
+			frozenset() if length_bound is not None
+				and length_bound(len(seq_a), len(seq_b)) > limit
+			else CUTOFF_FUNCS[func](seq_a, seq_b, cost_func, max_cost, **kwargs)
+			for seq_a, seq_b in pairs]
+
+	if func in UNIT_COST_FUNCS and len(pairs) >= BITPARALLEL_MIN_BATCH \
+			and get_unit_costs(cost_func) is not None:
+		res = UNIT_COST_FUNCS[func](pairs, cost_func, **kwargs)
+	elif func in BATCH_FUNCS and len(pairs) >= BATCH_MIN_SIZE:
+		res = BATCH_FUNCS[func](pairs, cost_func, **kwargs)
+	else:
+		res = [align_func(seq_a, seq_b, cost_func) for seq_a, seq_b in pairs]
+
+	if max_cost is not None:
+		res = [frozenset([alignment for alignment in alignments
+						if alignment.delta <= max_cost])
+				for alignments in res]
+
+	return res
@@ -0,0 +1,119 @@
+import collections
+import hashlib
+import os
+import pickle
+
+from code.utils import open_for_replacing
+
+
+
+class AlignmentCache:
+	"""
+	Two-tier cache for the results of align funcs, i.e. the frozen sets of
+	Alignment tuples of (ipa_a, ipa_b) pairs. The first tier is a bounded
+	in-memory LRU dict; the second, optional one is a directory of pickle files
+	named after the sha1 hashes of their keys.
+
+	The namespace should identify everything else the results depend on (the
+	vectors module and its args, the fingerprint of the data it has loaded, the
+	algorithm, etc.), so that the same cache dir can be shared by different
+	runs and is not stale after a model is retrained at the same path.
+
+	Usage:
+
+		cache = AlignmentCache(('phoible', (), 'standard'), cache_dir='cache')
+
+		alignments = cache.get(ipa_a, ipa_b)
+		if alignments is None:
+			alignments = align_func(ipa_a, ipa_b, cost_func)
+			cache.set(ipa_a, ipa_b, alignments)
+
+		print(cache.hits, cache.misses)
+	"""
+
+	def __init__(self, namespace, max_size=10000, cache_dir=None):
+		"""
+		Init the instance's props. Raise a ValueError if the cache dir is set
+		but cannot be created.
+		"""
+		self.namespace = namespace
+		self.max_size = max_size
+		self.cache_dir = cache_dir
+
+		self.memory = collections.OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+
+		if cache_dir is not None:
+			try:
+				os.makedirs(cache_dir, exist_ok=True)
+			except OSError as err:
+				raise ValueError('Could not create cache dir: {}'.format(err))
+
+
+	def get_path(self, ipa_a, ipa_b):
+		"""
+		Return the path of the file in the cache dir that would store the
+		results for the given pair.
+		"""
+		key = repr((self.namespace, tuple(ipa_a), tuple(ipa_b)))
+		digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+		return os.path.join(self.cache_dir, digest[:2], digest)
+
+
+	def get(self, ipa_a, ipa_b):
+		"""
+		Return the cached results for the given pair or None if these are
+		missing from both tiers.
+		"""
+		key = (ipa_a, ipa_b)
+
+		if key in self.memory:
+			self.memory.move_to_end(key)
+			self.hits += 1
+			return self.memory[key]
+
+		if self.cache_dir is not None:
+			try:
+				with open(self.get_path(ipa_a, ipa_b), 'rb') as f:
+					value = pickle.load(f)
+			except (OSError, pickle.UnpicklingError, EOFError):
+				pass
+			else:
+				self._remember(key, value)
+				self.hits += 1
+				return value
+
+		self.misses += 1
+		return None
+
+
+	def set(self, ipa_a, ipa_b, value):
+		"""
+		Store the results for the given pair in both tiers.
+		"""
+		self._remember((ipa_a, ipa_b), value)
+
+		if self.cache_dir is not None:
+			path = self.get_path(ipa_a, ipa_b)
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+
+			with open_for_replacing(path, 'wb') as f:
+				pickle.dump(value, f, protocol=3)
+
+
+	def _remember(self, key, value):
+		"""
+		Add an entry to the in-memory tier, evicting the least recently used
+		one if the tier is full.
+		"""
+		if self.max_size <= 0:
+			return
+
+		self.memory[key] = value
+		self.memory.move_to_end(key)
+
+		if len(self.memory) > self.max_size:
+			self.memory.popitem(last=False)
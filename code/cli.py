@@ -1,14 +1,26 @@
 import argparse
 import csv
+import functools
 import sys
 import warnings
 
-from code.align import list_algorithms, get_align_func
+from code.align import SCORE_ALGORITHMS, list_algorithms, get_align_func
+from code.cache import AlignmentCache
 from code.data import (
-		DatasetError, WordsDataset, AlignmentsDataset, write_alignments)
+		DatasetError, WordsDataset, AlignmentsDataset,
+		write_alignments, write_scores)
 from code.eval import evaluate
 from code.main import main
 from code.phon.base import Phon
+from code.stats import Stats, profile
+
+
+
+"""
+How many word pairs' alignments RunCli keeps in memory for reuse, unless the
+--cache-size arg says otherwise.
+"""
+DEFAULT_CACHE_SIZE = 10000
 
 
 
@@ -72,6 +84,43 @@ def init_dataset(path, file_format=None, columns=None):
 		return WordsDataset(path, dialect, columns)
 
 
+def add_stats_args(arg_group):
+	"""
+	Add the --stats, --stats-output, and --profile args to the given argparse
+	argument group.
+
+	Helper for the Cli classes' ArgumentParser instances.
+	"""
+	arg_group.add_argument(
+		'--stats',
+		action='store_true',
+		help=(
+			'report the wall and cpu time spent in each stage of the run, '
+			'the counters of the work done, and the peak memory usage; '
+			'these are written to stderr'))
+	arg_group.add_argument(
+		'--stats-output',
+		help=(
+			'path where to write the stats in json format instead; '
+			'implies --stats'))
+	arg_group.add_argument(
+		'--profile',
+		help=(
+			'path where to dump the cProfile stats of the run to, '
+			'in the format of the pstats module; '
+			'worker processes are not profiled'))
+
+
+def write_stats(stats, args):
+	"""
+	Write the Stats instance as the --stats and --stats-output args call for.
+
+	Helper for the Cli classes' run methods.
+	"""
+	if args.stats or args.stats_output:
+		stats.write(args.stats_output)
+
+
 def print_to_stderr(message, *args, **kwargs):
 	"""
 	Custom implementation of the default warnings.showwarning func that simply
@@ -114,6 +163,25 @@ class RunCli:
 			help=(
 				'which alignment algorithm to use; '
 				'the default is the standard Needleman-Wunsch'))
+		algo_args.add_argument(
+			'--max-alignments',
+			type=int,
+			help=(
+				'output at most that many of the optimal alignments of each '
+				'word pair; the default is to output all of them'))
+		algo_args.add_argument(
+			'--first-only',
+			action='store_true',
+			help=(
+				'output only the first optimal alignment of each word pair; '
+				'the same as --max-alignments 1'))
+		algo_args.add_argument(
+			'--max-delta',
+			type=float,
+			help=(
+				'output only the alignments the delta of which is at most '
+				'this value, e.g. for screening for cognates; the word pairs '
+				'that cannot be aligned within it are given up on early'))
 		algo_args.add_argument(
 			'--vectors',
 			choices=Phon.MODULES, default='phoible',
@@ -145,10 +213,30 @@ class RunCli:
 		io_args.add_argument(
 			'--output',
 			help=(
-				'path where to write the output, in psa format; '
+				'path where to write the output, in psa format '
+				'(or in tsv format if the algorithm is score-only); '
 				'if omitted or set to - (a hyphen), write to stdout'))
 
 		other_args = self.parser.add_argument_group('optional arguments - other')
+		other_args.add_argument(
+			'--cache-size',
+			type=int,
+			help=(
+				'how many word pairs\' alignments to keep in memory for reuse; '
+				'set to 0 to disable; the default is {}'.format(
+					DEFAULT_CACHE_SIZE)))
+		other_args.add_argument(
+			'--cache-dir',
+			help=(
+				'path to a dir where to also cache alignments across runs; '
+				'the default is to not use such a dir'))
+		other_args.add_argument(
+			'--jobs',
+			type=int, default=1,
+			help=(
+				'number of worker processes to spread the language pairs over; '
+				'the default is 1, i.e. no worker processes'))
+		add_stats_args(other_args)
 		other_args.add_argument(
 			'-h', '--help',
 			action='help',
@@ -162,14 +250,60 @@ class RunCli:
 		"""
 		args = self.parser.parse_args(raw_args)
 
+		if args.jobs < 1:
+			self.parser.error('--jobs should be a positive integer')
+
+		stats = Stats()
+
+		with profile(args.profile):
+			self.align(args, stats)
+
+		write_stats(stats, args)
+
+
+	def align(self, args, stats):
+		"""
+		Align the dataset and write the output as the parsed args call for,
+		timing each stage of the run with the given Stats instance.
+		"""
 		try:
-			dataset = init_dataset(args.dataset, args.format, args.columns)
-			phon = Phon(args.vectors)
-			phon.load(args.extra)
+			with stats.stage('read'):
+				dataset = init_dataset(args.dataset, args.format, args.columns)
+
+			with stats.stage('load'):
+				phon = Phon(args.vectors)
+				phon.load(args.extra)
 		except (DatasetError, ValueError) as err:
 			self.parser.error(str(err))
 
-		alignments = main(dataset, get_align_func(args.align), phon)
+		if args.first_only:
+			args.max_alignments = 1
+		elif args.max_alignments is not None and args.max_alignments < 1:
+			self.parser.error('--max-alignments should be a positive integer')
+
+		align_func = get_align_func(args.align)
+		if args.max_alignments:
+			align_func = functools.partial(
+							align_func, max_alignments=args.max_alignments)
+
+		cache_size = DEFAULT_CACHE_SIZE \
+				if args.cache_size is None else args.cache_size
+
+		if cache_size > 0 or args.cache_dir:
+			namespace = (
+				phon.module_id, tuple(sorted(args.extra.items())),
+				phon.get_fingerprint(),
+				args.align, args.max_alignments, args.max_delta)
+			try:
+				cache = AlignmentCache(namespace, cache_size, args.cache_dir)
+			except ValueError as err:
+				self.parser.error(str(err))
+		else:
+			cache = None
+
+		alignments = main(
+				dataset, align_func, phon, args.jobs, cache, args.max_delta,
+				stats)
 
 		header = '{} alignment, {} vectors'.format(args.align, args.vectors)
 		if args.extra:
@@ -177,7 +311,18 @@ class RunCli:
 				'{}={}'.format(key, value)
 				for key, value in sorted(args.extra.items())]))
 
-		write_alignments(alignments, args.output, header)
+		with stats.stage('write'):
+			if args.align in SCORE_ALGORITHMS:
+				write_scores(alignments, args.output)
+			else:
+				write_alignments(alignments, args.output, header)
+
+		report_cache = args.stats or args.stats_output \
+				or args.cache_size is not None or args.cache_dir
+
+		if cache is not None and not phon.has_pair_costs() and report_cache:
+			print('alignment cache: {} hits, {} misses'.format(
+				cache.hits, cache.misses), file=sys.stderr)
 
 
 
@@ -218,6 +363,7 @@ class EvalCli:
 				'if omitted or set to - (a hyphen), write to stdout'))
 
 		other_args = self.parser.add_argument_group('optional arguments - other')
+		add_stats_args(other_args)
 		other_args.add_argument(
 			'-h', '--help',
 			action='help',
@@ -231,20 +377,42 @@ class EvalCli:
 		"""
 		args = self.parser.parse_args(raw_args)
 
+		stats = Stats()
+
+		with profile(args.profile):
+			self.evaluate(args, stats)
+
+		write_stats(stats, args)
+
+
+	def evaluate(self, args, stats):
+		"""
+		Evaluate the predicted alignments and write the output as the parsed
+		args call for, timing each stage of the run with the given Stats
+		instance.
+		"""
 		try:
-			dataset_true = init_dataset(args.dataset_true, 'psa')
-			dataset_pred = init_dataset(args.dataset_pred, 'psa')
+			with stats.stage('read'):
+				dataset_true = init_dataset(args.dataset_true, 'psa')
+				dataset_pred = init_dataset(args.dataset_pred, 'psa')
 		except (DatasetError, ValueError) as err:
 			self.parser.error(str(err))
 
-		evaluation = evaluate(dataset_true, dataset_pred)
+		with stats.stage('evaluate'):
+			evaluation = evaluate(dataset_true, dataset_pred)
+
+		stats.count('pairs', evaluation.num_total)
+		stats.count('mistakes', len(evaluation.mistakes))
+
 		header = '{} → {} pairs, {} full matches, score {:.2f} ({:.2f}%)'.format(
 				dataset_pred.header, evaluation.num_total,
 				evaluation.num_correct, evaluation.score,
 				evaluation.score / evaluation.num_total * 100)
 
 		print(header)
-		write_alignments(evaluation.mistakes, args.output, header)
+
+		with stats.stage('write'):
+			write_alignments(evaluation.mistakes, args.output, header)
 
 
 
@@ -290,6 +458,7 @@ class TrainCli:
 				'by default this is models/$MODEL'))
 
 		other_args = self.parser.add_argument_group('optional arguments - other')
+		add_stats_args(other_args)
 		other_args.add_argument(
 			'-h', '--help',
 			action='help',
@@ -303,11 +472,17 @@ class TrainCli:
 		"""
 		args = self.parser.parse_args(raw_args)
 
-		try:
-			phon = Phon(args.model)
-			phon.train(args.dataset, args.output, args.extra)
-		except ValueError as err:
-			self.parser.error(str(err))
+		stats = Stats()
+
+		with profile(args.profile):
+			try:
+				with stats.stage('train'):
+					phon = Phon(args.model)
+					phon.train(args.dataset, args.output, args.extra)
+			except ValueError as err:
+				self.parser.error(str(err))
+
+		write_stats(stats, args)
 
 
 
@@ -129,6 +129,28 @@ class WordsDataset(Dataset):
 		self.is_tokenised = is_tokenised
 
 		self.words = [word for word in self._read_words()]
+		self.index = self._build_index()
+
+
+	def _build_index(self):
+		"""
+		Return the {lang: {concept: [Word, ..]}} dict of self.words. The lists
+		do not contain duplicates and, as with the dicts, keep the order in
+		which the words occur in the dataset.
+
+		Helper for the __init__ method.
+		"""
+		index = collections.OrderedDict()
+
+		for word in self.words:
+			concepts = index.setdefault(word.lang, collections.OrderedDict())
+			concepts.setdefault(word.concept, collections.OrderedDict())[word] = True
+
+		return collections.OrderedDict([
+			(lang, collections.OrderedDict([
+				(concept, list(words.keys()))
+				for concept, words in concepts.items()]))
+			for lang, concepts in index.items()])
 
 
 	def _read_ipa(self, string):
@@ -181,14 +203,16 @@ class WordsDataset(Dataset):
 		"""
 		Return the sorted list of languages found in the dataset.
 		"""
-		return sorted(set([word.lang for word in self.words]))
+		return sorted(self.index.keys())
 
 
 	def get_words(self, lang):
 		"""
 		Return the list of Word tuples of a language.
 		"""
-		return [word for word in self.words if word.lang == lang]
+		return [word
+				for words in self.index.get(lang, {}).values()
+				for word in words]
 
 
 	def get_word_pairs(self, lang_a, lang_b):
@@ -197,20 +221,12 @@ class WordsDataset(Dataset):
 		"""
 		pairs = []
 
-		words_a = [word for word in self.words if word.lang == lang_a]
-		words_b = [word for word in self.words if word.lang == lang_b]
-
-		dict_a = collections.defaultdict(set)
-		for word in words_a:
-			dict_a[word.concept].add(word)
+		dict_a = self.index.get(lang_a, {})
+		dict_b = self.index.get(lang_b, {})
 
-		dict_b = collections.defaultdict(set)
-		for word in words_b:
-			dict_b[word.concept].add(word)
-
-		concepts = set(dict_a.keys()) & set(dict_b.keys())
-		for concept in concepts:
-			pairs.extend(list(itertools.product(dict_a[concept], dict_b[concept])))
+		for concept, words_a in dict_a.items():
+			if concept in dict_b:
+				pairs.extend(itertools.product(words_a, dict_b[concept]))
 
 		return pairs
 
@@ -276,6 +292,16 @@ class AlignmentsDataset(Dataset):
 				self.data.append((
 					word_b, word_a, self._reverse_alignment(alignment)))
 
+		self.index = collections.defaultdict(list)  # (lang_a, lang_b): data
+		self.lang_words = collections.defaultdict(set)  # lang: {Word, ..}
+
+		for entry in self.data:
+			self.index[(entry[0].lang, entry[1].lang)].append(entry)
+			self.lang_words[entry[0].lang].add(entry[0])
+			self.lang_words[entry[1].lang].add(entry[1])
+
+		self._alignments = {}  # (lang_a, lang_b): get_alignments() result
+
 
 	def _reverse_alignment(self, alignment):
 		"""
@@ -290,6 +316,23 @@ class AlignmentsDataset(Dataset):
 				alignment.comment)
 
 
+	def _parse_cell(self, cell):
+		"""
+		Parse a cell of a .psa line. Cells of several space-separated tokens,
+		as written by write_alignments for the merged tokens of the align
+		module, are returned as tuples of tokens, the rest as single tokens.
+
+		Helper for the _parse_word method.
+		"""
+		tokens = tuple([
+			self.sanitise_token(token, self.keep_digits) for token in cell.split()])
+
+		if len(tokens) > 1:
+			return tokens
+
+		return tokens[0] if tokens else ''
+
+
 	def _parse_word(self, line):
 		"""
 		Parse a .psa line comprising a word, i.e. the second or third line of a
@@ -298,11 +341,11 @@ class AlignmentsDataset(Dataset):
 		lang, align = line.split('\t', maxsplit=1)
 		lang = lang.strip('.')
 
-		align = tuple([
-			self.sanitise_token(token, self.keep_digits) if token != '' else ''
-			for token in align.split('\t')])
+		align = tuple([self._parse_cell(cell) for cell in align.split('\t')])
 
-		ipa = tuple([token for token in align if token])
+		ipa = tuple([token
+				for cell in align if cell
+				for token in (cell if isinstance(cell, tuple) else (cell,))])
 
 		return Word(lang, None, ipa), align
 
@@ -356,26 +399,14 @@ class AlignmentsDataset(Dataset):
 		"""
 		Return the sorted list of languages found in the dataset.
 		"""
-		langs = set()
-
-		for word_a, word_b, _ in self.data:
-			langs.add(word_a.lang)
-			langs.add(word_b.lang)
-
-		return sorted(langs)
+		return sorted(self.lang_words.keys())
 
 
 	def get_words(self, lang):
 		"""
 		Return the sorted list of Word tuples of a language.
 		"""
-		words = []
-
-		for word_a, word_b, _ in self.data:
-			if word_a.lang == lang: words.append(word_a)
-			if word_b.lang == lang: words.append(word_b)
-
-		return sorted(set(words))
+		return sorted(self.lang_words.get(lang, set()))
 
 
 	def get_word_pairs(self, lang_a, lang_b):
@@ -383,74 +414,102 @@ class AlignmentsDataset(Dataset):
 		Return the list of aligned Word pairs of two languages.
 		"""
 		if lang_b < lang_a:
-			reverse_langs = True
-			lang_a, lang_b = lang_b, lang_a
-		else:
-			reverse_langs = False
+			return [(word_b, word_a) for word_a, word_b, _
+						in self.index.get((lang_b, lang_a), [])]
 
-		pairs = [(word_a, word_b) for word_a, word_b, _ in self.data
-					if word_a.lang == lang_a and word_b.lang == lang_b]
-
-		if reverse_langs:
-			pairs = [(b, a) for a, b in pairs]
-
-		return pairs
+		return [(word_a, word_b) for word_a, word_b, _
+					in self.index.get((lang_a, lang_b), [])]
 
 
 	def get_alignments(self, lang_a, lang_b):
 		"""
 		Return the {(Word, Word): set of Alignment tuples} dict comprising the
 		dataset's alignments for two languages.
+
+		The dicts are built once per (ordered) language pair and then cached,
+		so the caller should not modify them.
 		"""
+		if (lang_a, lang_b) in self._alignments:
+			return self._alignments[(lang_a, lang_b)]
+
 		if lang_b < lang_a:
-			reverse_langs = True
-			lang_a, lang_b = lang_b, lang_a
+			res = {(b, a): set([self._reverse_alignment(x) for x in value])
+					for (a, b), value in self.get_alignments(lang_b, lang_a).items()}
 		else:
-			reverse_langs = False
-
-		res = collections.defaultdict(set)
+			res = collections.defaultdict(set)
 
-		for word_a, word_b, alignment in self.data:
-			if word_a.lang == lang_a and word_b.lang == lang_b:
+			for word_a, word_b, alignment in self.index.get((lang_a, lang_b), []):
 				res[(word_a, word_b)].add(alignment)
 
-		if reverse_langs:
-			res = {(b, a): set([self._reverse_alignment(x) for x in value])
-						for (a, b), value in res.items()}
-		else:
 			res = dict(res)
 
+		self._alignments[(lang_a, lang_b)] = res
 		return res
 
 
 
+def _format_cell(token):
+	"""
+	Format a token of an alignment as a .psa cell: '-' for indels and the
+	space-separated tokens for tuples of merged tokens.
+
+	Helper for the write_alignments func.
+	"""
+	if not token:
+		return '-'
+
+	return token if isinstance(token, str) else ' '.join(token)
+
+
+
 def write_alignments(alignments, path=None, header='OUTPUT'):
 	"""
-	Write a list of (Word, Word, Alignment) tuples to a psa file. The last
+	Write an iterable of (Word, Word, Alignment) tuples to a psa file. The last
 	element of each tuple should be an Alignment named tuple from either this
-	or the align module.
+	or the align module; the tuples of merged tokens that the latter can yield
+	are written as their space-separated tokens, which AlignmentsDataset reads
+	back as tuples.
 
-	If path is None or '-', use stdout.
+	The tuples are written as they come, so the iterable can be a generator
+	that is too large to keep in memory. If path is None or '-', use stdout.
 	"""
-	lines = [header]
+	with open_for_writing(path) as f:
+		f.write(header)
 
-	for word_a, word_b, alignment in alignments:
-		field_size = str(max(len(word_a.lang), len(word_b.lang)))
-		lang_a = ('{:.<'+ field_size +'}').format(word_a.lang)
-		lang_b = ('{:.<'+ field_size +'}').format(word_b.lang)
+		for word_a, word_b, alignment in alignments:
+			field_size = str(max(len(word_a.lang), len(word_b.lang)))
+			lang_a = ('{:.<'+ field_size +'}').format(word_a.lang)
+			lang_b = ('{:.<'+ field_size +'}').format(word_b.lang)
 
-		align_a = [token if token else '-' for token, _ in alignment.corr]
-		align_b = [token if token else '-' for _, token in alignment.corr]
+			align_a = [_format_cell(token) for token, _ in alignment.corr]
+			align_b = [_format_cell(token) for _, token in alignment.corr]
 
-		line_a = '\t'.join([lang_a] + align_a)
-		line_b = '\t'.join([lang_b] + align_b)
+			line_a = '\t'.join([lang_a] + align_a)
+			line_b = '\t'.join([lang_b] + align_b)
 
-		if hasattr(alignment, 'comment'):
-			comment = alignment.comment
-		else:
-			comment = str(word_a.concept)
+			if hasattr(alignment, 'comment'):
+				comment = alignment.comment
+			else:
+				comment = str(word_a.concept)
 
-		lines.extend([comment, line_a, line_b, ''])
+			f.write('\n' + '\n'.join([comment, line_a, line_b, '']))
 
-	with open_for_writing(path) as f:
-		f.write('\n'.join(lines))
+
+
+def write_scores(alignments, path=None, dialect='excel-tab'):
+	"""
+	Write an iterable of (Word, Word, Alignment) tuples to a csv file using the
+	given dialect, one row per tuple comprising the two words' languages and
+	transcriptions, and the alignment's delta. Meant for the output of the
+	score-only align funcs, which do not yield correspondences.
+
+	If path is None or '-', use stdout.
+	"""
+	with open_for_writing(path, newline='') as f:
+		writer = csv.writer(f, dialect=dialect)
+		writer.writerow(['language_a', 'ipa_a', 'language_b', 'ipa_b', 'delta'])
+
+		for word_a, word_b, alignment in alignments:
+			writer.writerow([
+				word_a.lang, ' '.join(word_a.ipa),
+				word_b.lang, ' '.join(word_b.ipa), alignment.delta])
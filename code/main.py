@@ -1,4 +1,27 @@
+import collections
 import itertools
+import multiprocessing
+
+from code.align import COUNTERS, align_pairs
+from code.phon.base import Phon
+from code.stats import Stats
+
+
+
+"""
+Phon and AlignmentCache instances used by the worker processes of main();
+inited in init_worker().
+"""
+WORKER_PHON = None
+WORKER_CACHE = None
+
+
+"""
+How many language pairs per worker process main() can have handed over to
+the pool at any one time, aligned or not; bounds the memory taken up by the
+pending tasks and results if the consumer of main() falls behind.
+"""
+MAX_PENDING_PER_JOB = 4
 
 
 
@@ -18,20 +41,165 @@ def collect_inventories(dataset):
 
 
 
-def main(dataset, align_func, phon):
+def align_lang_pair(phon, align_func, word_pairs,
+					inventory_a, inventory_b, max_delta=None, cache=None):
+	"""
+	Align the word pairs of a language pair, given the phoneme inventories of
+	the two languages. Return the respective [(Word, Word, Alignment), ..].
+	If max_delta is set, the alignments with a higher delta are left out.
+
+	If an AlignmentCache is given, only the transcription pairs missing from
+	it are aligned (and then added to it).
+	"""
+	if not word_pairs:
+		return []
+
+	ipa_pairs = [(word_a.ipa, word_b.ipa) for word_a, word_b in word_pairs]
+
+	if cache is None:
+		cost_func = phon.get_cost_matrix(inventory_a, inventory_b)
+		results = align_pairs(ipa_pairs, align_func, cost_func, max_delta)
+
+	else:
+		found = {pair: cache.get(*pair) for pair in set(ipa_pairs)}
+		missing = [pair for pair, value in found.items() if value is None]
+
+		if missing:
+			cost_func = phon.get_cost_matrix(inventory_a, inventory_b)
+
+			for pair, value in zip(missing,
+					align_pairs(missing, align_func, cost_func, max_delta)):
+				cache.set(*pair, value)
+				found[pair] = value
+
+		results = [found[pair] for pair in ipa_pairs]
+
+	return [(word_a, word_b, alignment)
+			for (word_a, word_b), alignments in zip(word_pairs, results)
+			for alignment in alignments]
+
+
+
+def init_worker(module_id, extra_args, cache):
+	"""
+	Init and load the Phon instance of a worker process and set its cache,
+	which can be None. Used as the process pool initializer in main().
+	"""
+	global WORKER_PHON, WORKER_CACHE
+
+	WORKER_PHON = Phon(module_id)
+	WORKER_PHON.load(extra_args)
+
+	WORKER_CACHE = cache
+
+
+
+def align_in_worker(args):
 	"""
+	Call align_lang_pair with the worker's Phon and cache instances and the
+	given tuple of the rest of the args. Used as the process pool func in
+	main(). Return the output, the worker's cache hits and misses, and the
+	align funcs' counters.
 	"""
-	output = []  # [(Word, Word, Alignment), ..]
+	output = align_lang_pair(WORKER_PHON, *args, cache=WORKER_CACHE)
+
+	counters = dict(COUNTERS)
+	COUNTERS.clear()
+
+	if WORKER_CACHE is None:
+		return output, 0, 0, counters
+
+	hits, misses = WORKER_CACHE.hits, WORKER_CACHE.misses
+	WORKER_CACHE.hits, WORKER_CACHE.misses = 0, 0
+
+	return output, hits, misses, counters
+
+
+
+def imap_bounded(pool, func, iterable, max_pending):
+	"""
+	Like pool.imap, generate the results of calling the func on the items of
+	the iterable, in order. Unlike it, only take the next item once there are
+	less than max_pending items submitted but not yet generated, so that
+	neither the items nor the results pile up in memory.
+	"""
+	pending = collections.deque()
+
+	for item in iterable:
+		pending.append(pool.apply_async(func, (item,)))
+
+		if len(pending) >= max_pending:
+			yield pending.popleft().get()
+
+	while pending:
+		yield pending.popleft().get()
+
+
+
+def main(dataset, align_func, phon, jobs=1, cache=None, max_delta=None,
+			stats=None):
+	"""
+	Align the word pairs of each pair of languages in the dataset. Generate
+	the (Word, Word, Alignment) tuples, one language pair at a time. If
+	max_delta is set, only the alignments with at most that delta are
+	generated; the word pairs that cannot be aligned within it are given up
+	on as early as possible.
+
+	If jobs is more than 1, spread the language pairs over that many worker
+	processes, each of which loads its own copy of the phon's module; the
+	output is in the same order as that of the single-process run; at most
+	MAX_PENDING_PER_JOB language pairs per worker are in flight at a time.
+
+	If an AlignmentCache is given, it is used for skipping the transcription
+	pairs that have already been aligned, unless the phon's costs depend on
+	the language pair. With worker processes, each of them uses its own copy
+	of the cache and the hits and misses are added up in the given one.
+
+	If a Stats instance is given, the collecting of the phoneme inventories and
+	the aligning (or, with worker processes, the waiting for the latter) are
+	timed as its inventories and align stages, and the align funcs' counters
+	(see code.align.COUNTERS) and the number of alignments are added to it.
+	"""
+	if phon.has_pair_costs():
+		cache = None
+
+	if stats is None:
+		stats = Stats()
+
+	with stats.stage('inventories'):
+		phon_inv = collect_inventories(dataset)
+
+	lang_pairs = (
+		(lang_a, lang_b, dataset.get_word_pairs(lang_a, lang_b))
+		for lang_a, lang_b in itertools.combinations(dataset.get_langs(), 2))
+
+	tasks = (
+		(align_func, word_pairs, phon_inv[lang_a], phon_inv[lang_b], max_delta)
+		for lang_a, lang_b, word_pairs in lang_pairs if word_pairs)
+
+	if jobs > 1:
+		with multiprocessing.Pool(jobs, init_worker,
+				(phon.module_id, phon.extra_args, cache)) as pool:
+			results = imap_bounded(pool, align_in_worker, tasks,
+					jobs * MAX_PENDING_PER_JOB)
 
-	phon_inv = collect_inventories(dataset)
+			for res, hits, misses, counters in stats.iter_stage(
+					'align', results):
+				if cache is not None:
+					cache.hits += hits
+					cache.misses += misses
 
-	for lang_a, lang_b in itertools.combinations(dataset.get_langs(), 2):
-		word_pairs = dataset.get_word_pairs(lang_a, lang_b)
+				stats.counters.update(counters)
+				stats.count('alignments', len(res))
 
-		cost_func = phon.get_cost_func(phon_inv[lang_a], phon_inv[lang_b])
+				yield from res
+	else:
+		for args in tasks:
+			with stats.stage('align'):
+				res = align_lang_pair(phon, *args, cache=cache)
 
-		for word_a, word_b in word_pairs:
-			alignments = align_func(word_a.ipa, word_b.ipa, cost_func)
-			output.extend([(word_a, word_b, x) for x in alignments])
+			stats.counters.update(COUNTERS)
+			COUNTERS.clear()
+			stats.count('alignments', len(res))
 
-	return output
+			yield from res
@@ -1,5 +1,123 @@
 import importlib
 
+import numpy as np
+
+
+
+class CostMatrix:
+	"""
+	Dense table of the costs between the phonemes of two inventories, which
+	are interned to int ids. On either side id 0 stands for the empty string,
+	so the 0th column and row of the table hold the indel costs.
+
+	The align funcs look the costs up in the table directly, via the encode
+	methods and the sub, indel_a and indel_b views. Instances can also be used
+	in place of the cost funcs they are built from: calling one with phonemes
+	outside the inventories (e.g. the tuples that merge_align passes) falls
+	back to the original func.
+
+	If the costs come from a unit cost model, i.e. one with a single match, a
+	single mismatch and a single indel cost, these are kept as the unit_costs
+	(match, mismatch, indel) tuple; otherwise that prop is None.
+	"""
+
+	def __init__(self, tokens_a, tokens_b, table, cost_func, unit_costs=None):
+		"""
+		Init the instance's props. The first two args should be the lists of
+		phonemes, the 0th of each being the empty string; the table should be
+		a 2d float array of the respective shape.
+		"""
+		self.tokens_a = tokens_a
+		self.tokens_b = tokens_b
+
+		self.ids_a = {token: index for index, token in enumerate(tokens_a)}
+		self.ids_b = {token: index for index, token in enumerate(tokens_b)}
+
+		self.table = table
+		self.cost_func = cost_func
+
+		self.unit_costs = unit_costs
+
+		self._rows = table.tolist()
+
+
+	@classmethod
+	def tabulate(cls, cost_func, inventory_a, inventory_b,
+					matrix_func=None, unit_costs=None):
+		"""
+		Return a CostMatrix instance by calling the cost func on each pair of
+		phonemes of the two inventories (and the empty string).
+
+		If a matrix func is given, it is called once with the two lists of
+		phonemes instead and should return the respective 2d array of costs.
+		The last arg should be set if the cost func is a unit cost model.
+		"""
+		tokens_a = [''] + sorted(set(inventory_a) - set(['']))
+		tokens_b = [''] + sorted(set(inventory_b) - set(['']))
+
+		if matrix_func is not None:
+			table = np.array(matrix_func(tokens_a, tokens_b), dtype=float)
+		else:
+			table = np.array([
+				cost_func(token_a, token_b)
+				for token_a in tokens_a for token_b in tokens_b
+			], dtype=float).reshape(len(tokens_a), len(tokens_b))
+
+		return cls(tokens_a, tokens_b, table, cost_func, unit_costs)
+
+
+	@property
+	def sub(self):
+		"""
+		The 2d array of the substitution costs, i.e. the table without its 0th
+		row and column; element (i, j) is the cost of ids i+1 and j+1.
+		"""
+		return self.table[1:, 1:]
+
+
+	@property
+	def indel_a(self):
+		"""
+		The 1d array of the deletion costs of the phonemes of the first
+		inventory; element i is the cost of id i+1.
+		"""
+		return self.table[1:, 0]
+
+
+	@property
+	def indel_b(self):
+		"""
+		The 1d array of the insertion costs of the phonemes of the second
+		inventory; element j is the cost of id j+1.
+		"""
+		return self.table[0, 1:]
+
+
+	def __call__(self, phon_a, phon_b):
+		"""
+		Return the cost between two phonemes (or tuples of phonemes).
+		"""
+		try:
+			return self._rows[self.ids_a[phon_a]][self.ids_b[phon_b]]
+		except (KeyError, TypeError):
+			return self.cost_func(phon_a, phon_b)
+
+
+	def encode_a(self, seq):
+		"""
+		Return the 1d int array of the ids of the phonemes of a sequence from
+		the first inventory. Raise a KeyError if a phoneme is not in the latter.
+		"""
+		return np.array([self.ids_a[token] for token in seq], dtype=np.intp)
+
+
+	def encode_b(self, seq):
+		"""
+		Return the 1d int array of the ids of the phonemes of a sequence from
+		the second inventory. Raise a KeyError if a phoneme is not in the latter.
+		"""
+		return np.array([self.ids_b[token] for token in seq], dtype=np.intp)
+
 
 
 class Phon:
@@ -31,12 +149,19 @@ class Phon:
 		self.module_id = module_id.replace('-', '_')
 		self.module = importlib.import_module('code.phon.{}'.format(self.module_id))
 
+		self.extra_args = {}
+
 
 	def load(self, extra_args={}):
 		"""
 		Invoke the module's load() func (if it exists) with the given args.
 		Most modules must be loaded before their calc_delta func can be used.
+
+		The args are kept so that the module can be loaded the same way in
+		other processes.
 		"""
+		self.extra_args = dict(extra_args)
+
 		if hasattr(self.module, 'load'):
 			try:
 				self.module.load(**extra_args)
@@ -44,18 +169,64 @@ class Phon:
 				raise ValueError('unrecognised extra arguments')
 
 
+	def get_fingerprint(self):
+		"""
+		Return the string identifying the data that the module has loaded
+		(e.g. the PHOIBLE dataset or a trained model) or None if the module
+		does not load any. Unlike the module id and the extra args, this
+		changes if the data at the same path does.
+		"""
+		if hasattr(self.module, 'get_fingerprint'):
+			return self.module.get_fingerprint()
+
+		return None
+
+
+	def has_pair_costs(self):
+		"""
+		Return True if the costs between phonemes depend on the inventories of
+		the language pair, i.e. if the cost func is specific to the latter.
+		"""
+		return self.module_id == 'phoible_sub'
+
+
 	def get_cost_func(self, inventory_a, inventory_b):
 		"""
 		Return a function that takes two phonemes (or tuples of phonemes) as
 		input and returns the respective cost/delta.
 		"""
-		if self.module_id == 'phoible_sub':
-			pair = self.module.LangPair(inventory_a, inventory_b)
+		if self.has_pair_costs():
+			pair = self.module.get_lang_pair(inventory_a, inventory_b)
 			return pair.calc_delta
 		else:
 			return self.module.calc_delta
 
 
+	def get_cost_matrix(self, inventory_a, inventory_b):
+		"""
+		Return a CostMatrix instance comprising the costs between the phonemes
+		of the two inventories, as well as their indel costs.
+
+		The table is made in one go by the module's calc_delta_matrix func (or
+		that of the LangPair instance, for the modules with pair costs); the
+		modules lacking such a func fall back to calling calc_delta on each
+		pair of phonemes.
+
+		The modules with a unit cost model declare it as their UNIT_COSTS.
+		"""
+		if self.has_pair_costs():
+			pair = self.module.get_lang_pair(inventory_a, inventory_b)
+			cost_func = pair.calc_delta
+			matrix_func = getattr(pair, 'calc_delta_matrix', None)
+		else:
+			cost_func = self.module.calc_delta
+			matrix_func = getattr(self.module, 'calc_delta_matrix', None)
+
+		return CostMatrix.tabulate(
+				cost_func, inventory_a, inventory_b, matrix_func,
+				getattr(self.module, 'UNIT_COSTS', None))
+
+
 	def train(self, dataset_path, output_path=None, extra_args={}):
 		"""
 		Invoke the imported module's train func with the given args. Raise a
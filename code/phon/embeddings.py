@@ -0,0 +1,169 @@
+import collections.abc
+import hashlib
+import json
+import os
+import os.path
+import pickle
+import warnings
+
+import numpy as np
+
+from code.utils import open_for_replacing
+
+
+
+class Embeddings(collections.abc.Mapping):
+	"""
+	Read-only mapping from IPA tokens to their vector representations, backed
+	by a 2d float32 array with a row per token. This is what the nn and rnn
+	modules store their trained models as.
+
+	On disk a model is a pair of files: an .npy file with the array and a
+	.json file with the list of tokens. The array is memory-mapped when
+	loaded, so that processes using the same model share its pages.
+	"""
+
+	def __init__(self, tokens, matrix):
+		"""
+		Init the instance's props. The args should be the list of tokens and
+		the 2d array of the respective vectors.
+		"""
+		if len(tokens) != len(matrix):
+			raise ValueError('embeddings: tokens and vectors do not match')
+
+		self.tokens = list(tokens)
+		self.index = {token: index for index, token in enumerate(self.tokens)}
+
+		self.matrix = matrix
+
+
+	@classmethod
+	def from_dict(cls, vectors):
+		"""
+		Return an Embeddings instance comprising the vectors of the given
+		{token: vector} dict.
+		"""
+		tokens = sorted(vectors.keys())
+		matrix = np.array([vectors[token] for token in tokens], dtype=np.float32)
+
+		return cls(tokens, matrix.reshape(len(tokens), -1))
+
+
+	def __getitem__(self, token):
+		return self.matrix[self.index[token]]
+
+
+	def __contains__(self, token):
+		return token in self.index
+
+
+	def __iter__(self):
+		return iter(self.tokens)
+
+
+	def __len__(self):
+		return len(self.tokens)
+
+
+	def get_hash(self):
+		"""
+		Return the sha1 hex digest of the tokens and their vectors.
+		"""
+		h = hashlib.sha1()
+		h.update('\0'.join(self.tokens).encode('utf-8'))
+		h.update(np.ascontiguousarray(self.matrix, dtype=np.float32).tobytes())
+
+		return h.hexdigest()
+
+
+	@property
+	def size(self):
+		"""
+		The number of dimensions of the vectors.
+		"""
+		return self.matrix.shape[1]
+
+
+
+def get_paths(model_path):
+	"""
+	Return the paths of the .npy and the .json file of the model at the given
+	path; the latter may include the .npy extension or not.
+	"""
+	base, ext = os.path.splitext(model_path)
+
+	if ext != '.npy':
+		base = model_path
+
+	return base + '.npy', base + '.json'
+
+
+
+def save(embeddings, model_path):
+	"""
+	Write an Embeddings instance (or a {token: vector} dict) to the given
+	path. The files are written under temporary names first and then moved
+	into place. Raise an OSError on failure.
+	"""
+	if not isinstance(embeddings, Embeddings):
+		embeddings = Embeddings.from_dict(embeddings)
+
+	matrix_path, vocab_path = get_paths(model_path)
+	dir_path = os.path.dirname(matrix_path) or '.'
+
+	os.makedirs(dir_path, exist_ok=True)
+
+	with open_for_replacing(matrix_path, 'wb') as f:
+		np.save(f, np.ascontiguousarray(embeddings.matrix, dtype=np.float32))
+
+	with open_for_replacing(vocab_path) as f:
+		json.dump({'tokens': embeddings.tokens}, f, ensure_ascii=False)
+
+
+
+def load(model_path):
+	"""
+	Return the Embeddings instance stored at the given path, with its array
+	memory-mapped. If there is no such model but there is a pickled {token:
+	vector} dict at the path (i.e. a model in the old format), load that one
+	instead and warn about it. Raise an OSError or a ValueError on failure.
+	"""
+	matrix_path, vocab_path = get_paths(model_path)
+
+	if not os.path.exists(matrix_path) and os.path.isfile(model_path):
+		warnings.warn((
+			'{} is a pickled model, '
+			'use scripts/convert_model.py to convert it').format(model_path))
+		return load_pickle(model_path)
+
+	with open(vocab_path, encoding='utf-8') as f:
+		tokens = json.load(f)['tokens']
+
+	matrix = np.load(matrix_path, mmap_mode='r')
+
+	if matrix.ndim != 2:
+		raise ValueError('embeddings: bad model file: {}'.format(matrix_path))
+
+	return Embeddings(tokens, matrix)
+
+
+
+def load_pickle(model_path):
+	"""
+	Return an Embeddings instance comprising the vectors of the pickled
+	{token: vector} dict at the given path.
+	"""
+	with open(model_path, 'rb') as f:
+		return Embeddings.from_dict(pickle.load(f))
+
+
+
+def convert(pickle_path, model_path=None):
+	"""
+	Convert a pickled {token: vector} dict into the memory-mappable format.
+	By default the new files are written next to the pickle.
+	"""
+	if model_path is None:
+		model_path = pickle_path
+
+	save(load_pickle(pickle_path), model_path)
@@ -1,18 +1,14 @@
-import pickle
 import random
 import warnings
 
 from ipatok.ipa import is_letter, is_tie_bar
 from ipatok import tokenise
 
-from keras.layers import Dense, Dropout, Embedding, Flatten, Input
-from keras.models import Model
-
 import numpy as np
 
 from scipy.spatial.distance import cosine
 
-import tensorflow
+from code.phon import embeddings
 
 
 
@@ -24,8 +20,9 @@ DEFAULT_MODEL_PATH = 'models/nn'
 
 
 """
-Mapping from IPA tokens to their respective vector representations obtained in
-train(); inited in load() and used in get_vector() and calc_delta().
+Embeddings instance mapping IPA tokens to their respective vector
+representations obtained in train(); inited in load() and used in get_vector()
+and calc_delta().
 """
 VECTORS = None
 
@@ -94,7 +91,13 @@ def make_model(vocab_size, large_context=False):
 	Create and compile (but do not train) a Keras model that can be trained to
 	predict IPA tokens' left and right neighbours. The vocab_size arg should be
 	the total number of distinct tokens, including the non-token (0).
+
+	Keras is imported here rather than at module level, as it takes long to
+	import and is not needed for using an already trained model.
 	"""
+	from keras.layers import Dense, Dropout, Embedding, Flatten, Input
+	from keras.models import Model
+
 	main_input = Input(shape=(1,))
 	x = Embedding(
 			input_dim=vocab_size, output_dim=64, input_length=1,
@@ -131,9 +134,11 @@ def make_model(vocab_size, large_context=False):
 def train(dataset_path, output_path=DEFAULT_MODEL_PATH,
 			large_context=False, epochs=5, batch_size=32, seed=42):
 	"""
-	Train IPA token embeddings on a dataset and pickle the obtained vector
+	Train IPA token embeddings on a dataset and store the obtained vector
 	representations.
 	"""
+	import tensorflow
+
 	random.seed(seed)
 	np.random.seed(seed)
 	tensorflow.set_random_seed(seed)
@@ -152,20 +157,26 @@ def train(dataset_path, output_path=DEFAULT_MODEL_PATH,
 	vectors = {token: weights[index+1] for index, token in enumerate(tokens)}
 	vectors[''] = weights[0]
 
-	with open(output_path, 'wb') as f:
-		pickle.dump(vectors, f, protocol=3)
+	embeddings.save(vectors, output_path)
 
 
 
 def load(model=DEFAULT_MODEL_PATH):
 	"""
-	Load a model; this should be a pickled dict mapping IPA tokens to vector
-	representations.
+	Load a model, i.e. the embeddings stored by train(); the format is
+	described in code.phon.embeddings.
 	"""
 	global VECTORS
+	VECTORS = embeddings.load(model)
+
 
-	with open(model, 'rb') as f:
-		VECTORS = pickle.load(f)
+
+def get_fingerprint():
+	"""
+	Return the string identifying the loaded model, i.e. the hash of its
+	embeddings.
+	"""
+	return VECTORS.get_hash()
 
 
 
@@ -221,3 +232,61 @@ def calc_delta(phon_a, phon_b):
 		return 1
 
 	return cosine(vec_a, vec_b)
+
+
+
+def get_matrix(tokens, vector_func=None, size=None):
+	"""
+	Return (1) the 2d float array of the row-normalised vector representations
+	of the given IPA tokens, and (2) the 1d bool array flagging the tokens that
+	could be resolved; the rows of the others (and of the empty string) are
+	all zeroes. Each token is resolved only once.
+
+	The tokens are resolved by get_vector into vectors of VECTORS' size unless
+	another func and size are given, e.g. those of the rnn module.
+	"""
+	if vector_func is None:
+		vector_func, size = get_vector, VECTORS.size
+
+	vectors = np.zeros((len(tokens), size), dtype=np.float64)
+	found = np.zeros(len(tokens), dtype=bool)
+
+	cache = {}
+
+	for index, token in enumerate(tokens):
+		if token not in cache:
+			try:
+				cache[token] = vector_func(token) if token != '' else None
+			except KeyError:
+				cache[token] = None
+
+		if cache[token] is not None:
+			vectors[index] = cache[token]
+			found[index] = True
+
+	norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+	norms[norms == 0] = 1
+
+	return vectors / norms, found
+
+
+
+def calc_delta_matrix(phons_a, phons_b, vector_func=None, size=None):
+	"""
+	Return the 2d float array of the deltas between each of the phonemes of
+	the first sequence and each of those of the second one, i.e. the cosine
+	distances between their vector representations, computed as a single
+	matrix product. As with calc_delta, the delta is 1 if either phoneme is
+	the empty string or cannot be recognised.
+
+	The last two args are passed on to get_matrix.
+	"""
+	vectors_a, found_a = get_matrix(phons_a, vector_func, size)
+	vectors_b, found_b = get_matrix(phons_b, vector_func, size)
+
+	deltas = 1 - np.dot(vectors_a, vectors_b.T)
+
+	deltas[~found_a, :] = 1
+	deltas[:, ~found_b] = 1
+
+	return deltas
@@ -1,3 +1,33 @@
+import numpy as np
+
+
+
+"""
+The costs of a match, a mismatch, and an indel; as this is a unit cost model,
+the alignments can be computed by the bit-parallel engine of code.align.
+"""
+UNIT_COSTS = (-1, 1, 1)
+
+
+
+def calc_delta_matrix(phons_a, phons_b):
+	"""
+	Return the 2d int array of the deltas between each of the phonemes of the
+	first sequence and each of those of the second one.
+	"""
+	ids = {'': -1}
+
+	ids_a = np.array([ids.setdefault(phon, len(ids)) for phon in phons_a],
+					dtype=np.intp)
+	ids_b = np.array([ids.setdefault(phon, len(ids)) for phon in phons_b],
+					dtype=np.intp)
+
+	same = (ids_a[:, None] == ids_b[None, :]) & (ids_a != -1)[:, None]
+
+	return np.where(same, -1, 1)
+
+
+
 def calc_delta(phon_a, phon_b):
 	"""
 	Calculate the delta between two phonemes.
@@ -1,10 +1,15 @@
-import collections
+import collections.abc
 import csv
-import itertools
-import operator
+import hashlib
+import json
+import os
 import os.path
 import warnings
 
+import numpy as np
+
+from code.utils import open_for_replacing
+
 
 
 """
@@ -15,16 +20,55 @@ DATA_PATH = os.path.join(
 
 
 """
-Dict mapping IPA segments to PHOIBLE feature vectors; populated in load().
+Named tuple representing a PHOIBLE feature vector; inited in load(). Each
+element of the tuple is one of these values: -1, 0, 1.
 """
-SEGMENTS = collections.OrderedDict()
+Vector = None
 
 
 """
-Named tuple representing a PHOIBLE feature vector; inited in load(). Each
-element of the tuple is one of these values: -1, 0, 1.
+The PHOIBLE feature vectors as a 2d int8 array, one row per segment (the last
+one being the all-zeroes vector of the empty string), and the dict mapping the
+segments to their row indices; populated in load().
 """
-Vector = None
+MATRIX = None
+INDEX = {}
+
+
+"""
+Path of the dataset that MATRIX and INDEX were loaded from; used for making
+repeated load() calls no-ops.
+"""
+LOADED_PATH = None
+
+
+
+class SegmentVectors(collections.abc.Mapping):
+	"""
+	Read-only mapping from IPA segments to Vector tuples, backed by MATRIX and
+	INDEX; the tuples are only made when accessed.
+	"""
+
+	def __getitem__(self, segment):
+		return Vector._make(MATRIX[INDEX[segment]].tolist())
+
+
+	def __contains__(self, segment):
+		return segment in INDEX
+
+
+	def __iter__(self):
+		return iter(INDEX)
+
+
+	def __len__(self):
+		return len(INDEX)
+
+
+"""
+Mapping from IPA segments to PHOIBLE feature vectors; usable after load().
+"""
+SEGMENTS = SegmentVectors()
 
 
 
@@ -45,45 +89,231 @@ def canonise(segment):
 
 
 
-def load(path=DATA_PATH):
+def get_cache_paths(path):
 	"""
-	Define the Vector named tuple and populate the SEGMENTS dict. The specified
-	file should be like the raw-data/FEATURES/phoible-segments-features.tsv
-	dataset found in the phoible/dev repo.
+	Return the paths of the .npy file storing the matrix and of the .json file
+	storing the vocab (i.e. the feature names and the segments) of the binary
+	cache of the PHOIBLE dataset at the given path.
 	"""
-	global Vector
+	base = os.path.splitext(path)[0]
+	return base + '.npy', base + '.json'
+
+
+
+def get_source_info(path, with_hash=True):
+	"""
+	Return a dict with the mtime, size, and (optionally) sha1 hash of the file
+	at the given path; used for validating the binary cache.
+	"""
+	stat = os.stat(path)
+	info = {'mtime': stat.st_mtime, 'size': stat.st_size}
+
+	if with_hash:
+		with open(path, 'rb') as f:
+			info['sha1'] = hashlib.sha1(f.read()).hexdigest()
 
+	return info
+
+
+
+def parse_dataset(path):
+	"""
+	Parse the PHOIBLE dataset at the given path. Return the list of feature
+	names, the list of canonised segments, and the respective int8 matrix. The
+	last segment is the empty string, with all features set to 0.
+	"""
 	d = {'-': -1, '0': 0, '+': 1}
+	vectors = collections.OrderedDict()
 
 	with open(path, encoding='utf-8', newline='') as f:
 		reader = csv.reader(f, delimiter='\t')
 
-		header = next(reader)
-		Vector = collections.namedtuple('Vector', header[1:])
+		features = next(reader)[1:]
 
 		for line in reader:
-			SEGMENTS[canonise(line[0])] = \
-					Vector._make([d.get(elem, 1) for elem in line[1:]])
+			vectors[canonise(line[0])] = [d.get(elem, 1) for elem in line[1:]]
 
-	SEGMENTS[''] = Vector._make(itertools.repeat(0, len(Vector._fields)))
+	vectors[''] = [0] * len(features)
 
+	return features, list(vectors.keys()), \
+			np.array(list(vectors.values()), dtype=np.int8)
 
 
-def calc_delta(phon_a, phon_b):
+
+def read_cache(path):
 	"""
-	Calculate the delta between two phonemes, i.e. the dot product of their
-	PHOIBLE feature vectors.
+	Return the features, segments, and memory-mapped matrix stored in the
+	binary cache of the PHOIBLE dataset at the given path. Raise an OSError or
+	a ValueError if the cache is missing or outdated.
+
+	If the file's mtime or size have changed but its hash has not (e.g. after
+	a checkout), the cache's record of them is updated, so that the next load
+	does not have to hash the file again.
 	"""
-	if phon_a in SEGMENTS:
-		vec_a = SEGMENTS[phon_a]
-	else:
-		warnings.warn('phoible: cannot recognise {}'.format(phon_a))
-		vec_a = SEGMENTS['']
+	matrix_path, vocab_path = get_cache_paths(path)
+
+	with open(vocab_path, encoding='utf-8') as f:
+		vocab = json.load(f)
+
+	source = get_source_info(path, with_hash=False)
+
+	if (source['mtime'], source['size']) != \
+			(vocab['source']['mtime'], vocab['source']['size']):
+		source = get_source_info(path)
+
+		if source['sha1'] != vocab['source']['sha1']:
+			raise ValueError('outdated cache: {}'.format(vocab_path))
 
-	if phon_b in SEGMENTS:
-		vec_b = SEGMENTS[phon_b]
+		refresh = True
 	else:
-		warnings.warn('phoible: cannot recognise {}'.format(phon_b))
-		vec_b = SEGMENTS['']
+		refresh = False
+
+	matrix = np.load(matrix_path, mmap_mode='r')
+
+	if matrix.shape != (len(vocab['segments']), len(vocab['features'])):
+		raise ValueError('corrupt cache: {}'.format(matrix_path))
+
+	if refresh:
+		vocab['source'] = source
+
+		try:
+			with open_for_replacing(vocab_path) as f:
+				json.dump(vocab, f, ensure_ascii=False)
+		except OSError:
+			pass
+
+	return vocab['features'], vocab['segments'], matrix
+
+
+
+def write_cache(path, features, segments, matrix):
+	"""
+	Write the binary cache of the PHOIBLE dataset at the given path. The files
+	are first written to temporary files and then moved into place, so that
+	concurrent readers never see partial files. Raise an OSError on failure.
+	"""
+	matrix_path, vocab_path = get_cache_paths(path)
+
+	with open_for_replacing(matrix_path, 'wb') as f:
+		np.save(f, matrix)
+
+	vocab = {
+		'source': get_source_info(path),
+		'features': features,
+		'segments': segments}
+
+	with open_for_replacing(vocab_path) as f:
+		json.dump(vocab, f, ensure_ascii=False)
+
+
+
+def load(path=DATA_PATH):
+	"""
+	Define the Vector named tuple and set MATRIX and INDEX (and thus make the
+	SEGMENTS mapping usable). The specified file should be like the
+	raw-data/FEATURES/phoible-segments-features.tsv dataset found in the
+	phoible/dev repo.
+
+	The parsed dataset is cached in binary form next to the file and, as long
+	as the latter does not change, subsequent loads memory-map the cache
+	instead of parsing the file. Loading the same file again is a no-op.
+	"""
+	global Vector, MATRIX, LOADED_PATH
+
+	if LOADED_PATH == path:
+		return
+
+	try:
+		features, segments, matrix = read_cache(path)
+	except (OSError, ValueError, KeyError):
+		features, segments, matrix = parse_dataset(path)
+
+		try:
+			write_cache(path, features, segments, matrix)
+		except OSError:
+			pass
+
+	Vector = collections.namedtuple('Vector', features)
+
+	# indexing a memmap is several times slower than indexing a plain ndarray
+	# view of the same (still memory-mapped) data
+	MATRIX = matrix.view(np.ndarray)
+
+	INDEX.clear()
+	INDEX.update({segment: index for index, segment in enumerate(segments)})
+
+	LOADED_PATH = path
+
+
+
+def get_data_hash():
+	"""
+	Return the sha1 hex digest of the loaded PHOIBLE data, i.e. of its
+	segments and feature vectors.
+	"""
+	h = hashlib.sha1()
+	h.update('\0'.join(INDEX).encode('utf-8'))
+	h.update(np.ascontiguousarray(MATRIX).tobytes())
+
+	return h.hexdigest()
+
+
+
+def get_fingerprint():
+	"""
+	Return the string identifying the loaded data, so that the alignments
+	cached across runs are not reused once the dataset changes.
+	"""
+	return get_data_hash()
+
+
+
+def get_index(segment):
+	"""
+	Return the MATRIX row index of the given segment. An unrecognised one is
+	mapped onto the row of the empty string.
+	"""
+	if segment in INDEX:
+		return INDEX[segment]
+
+	warnings.warn('phoible: cannot recognise {}'.format(segment))
+	return INDEX['']
+
+
+
+def get_indices(segments):
+	"""
+	Return the 1d int array of the MATRIX row indices of the given segments.
+	The unrecognised ones are mapped onto the row of the empty string.
+	"""
+	return np.array([get_index(segment) for segment in segments], dtype=np.intp)
+
+
+
+def calc_delta_matrix(phons_a, phons_b):
+	"""
+	Return the 2d int array of the deltas between each of the phonemes of the
+	first sequence and each of those of the second one, i.e. the negated dot
+	products of their PHOIBLE feature vectors, computed as a single matrix
+	product.
+	"""
+	vectors_a = MATRIX[get_indices(phons_a)].astype(np.int32)
+	vectors_b = MATRIX[get_indices(phons_b)].astype(np.int32)
+
+	return - np.dot(vectors_a, vectors_b.T)
+
+
+
+def calc_delta(phon_a, phon_b):
+	"""
+	Calculate the delta between two phonemes, i.e. the dot product of their
+	PHOIBLE feature vectors. This is not a wrapper over calc_delta_matrix, as
+	building its index arrays costs several times more than the product of a
+	single pair of rows. As there, the rows are cast to int32, since the dot
+	product of int8 arrays is an int8 and would overflow with 128 or more
+	features.
+	"""
+	vector_a = MATRIX[get_index(phon_a)].astype(np.int32)
+	vector_b = MATRIX[get_index(phon_b)].astype(np.int32)
 
-	return - sum(map(operator.mul, vec_a, vec_b))
+	return - int(np.dot(vector_a, vector_b))
@@ -1,24 +1,104 @@
-import operator
+import hashlib
+import os.path
 import warnings
 
-from sklearn.decomposition import PCA
+import numpy as np
 
 from code.phon import phoible
+from code.utils import open_for_replacing
 
 
 
 """
-Dict mapping IPA segments to PCA-reduced PHOIBLE feature vectors.
+The PCA-reduced PHOIBLE feature vectors as a contiguous 2d float32 array;
+its rows correspond to those of phoible.MATRIX. Set in load().
 """
-SEGMENTS = {}
+MATRIX = None
+
+
+"""
+The deltas are rounded to multiples of this power of two (about 1e-6). The
+align funcs tell the co-optimal alignments apart by exact float equality; on
+such a grid the sums of deltas are exact, so alignments that add up the same
+deltas in a different order tie regardless of the order of the additions, and
+the rounding errors of the float32 vectors do not break ties either.
+"""
+DELTA_STEP = 2 ** -20
+
+
+
+
+def get_cache_path(path, n_components, random_state):
+	"""
+	Return the path of the .npz file storing the PCA projection fitted with
+	the given args onto the PHOIBLE dataset at the given path. The file name
+	includes the hash of the data, so that changing the latter makes the
+	projection refitted.
+	"""
+	return os.path.join(os.path.dirname(path),
+			'phoible_pc-{}-{}-{}.npz'.format(
+				n_components, random_state, phoible.get_data_hash()[:12]))
+
+
+
+def fit(n_components, random_state):
+	"""
+	Fit PCA with the given args onto the loaded PHOIBLE feature vectors.
+	Return the components, the mean, and the reduced vectors as float32 arrays.
+	"""
+	from sklearn.decomposition import PCA
+
+	pca = PCA(
+			n_components=n_components,
+			random_state=random_state)
+
+	vectors = pca.fit_transform(phoible.MATRIX)
+
+	return tuple([np.ascontiguousarray(array, dtype=np.float32)
+				for array in (pca.components_, pca.mean_, vectors)])
+
+
+
+def read_cache(cache_path):
+	"""
+	Return the components, the mean, and the reduced vectors stored in the
+	given cache file. Raise an OSError or a ValueError if the file is missing
+	or does not fit the loaded PHOIBLE data.
+	"""
+	with np.load(cache_path) as data:
+		components = data['components']
+		mean = data['mean']
+		vectors = np.ascontiguousarray(data['vectors'], dtype=np.float32)
+
+	if vectors.shape[0] != phoible.MATRIX.shape[0]:
+		raise ValueError('corrupt cache: {}'.format(cache_path))
+
+	return components, mean, vectors
+
+
+
+def write_cache(cache_path, components, mean, vectors):
+	"""
+	Write the given arrays into the given cache file. The file is first
+	written under a temporary name and then moved into place. Raise an
+	OSError on failure.
+	"""
+	with open_for_replacing(cache_path, 'wb') as f:
+		np.savez(f, components=components, mean=mean, vectors=vectors)
 
 
 
 def load(path=phoible.DATA_PATH, n_components=29, random_state=42):
 	"""
-	Populate the SEGMENTS dict by applying PCA onto phoible.SEGMENTS. Pass the
-	args onto the PCA constructor unless.
+	Set MATRIX by applying PCA onto the PHOIBLE feature vectors. Pass the
+	args onto the PCA constructor.
+
+	The fitted projection and the reduced vectors are cached next to the
+	PHOIBLE dataset, so PCA is only run once for each set of args (and sklearn
+	is only needed then).
 	"""
+	global MATRIX
+
 	phoible.load(path)
 
 	try:
@@ -33,32 +113,80 @@ def load(path=phoible.DATA_PATH, n_components=29, random_state=42):
 	except (ValueError, AssertionError):
 		raise ValueError('phoible-pc: bad value for random_state')
 
-	pca = PCA(
-			n_components=n_components,
-			random_state=random_state)
+	cache_path = get_cache_path(path, n_components, random_state)
+
+	try:
+		components, mean, vectors = read_cache(cache_path)
+	except (OSError, ValueError, KeyError):
+		components, mean, vectors = fit(n_components, random_state)
+
+		try:
+			write_cache(cache_path, components, mean, vectors)
+		except OSError:
+			pass
+
+	MATRIX = vectors
+
+
+
+def get_fingerprint():
+	"""
+	Return the string identifying the loaded data, i.e. the sha1 hex digest of
+	the PCA-reduced vectors.
+	"""
+	return hashlib.sha1(MATRIX.tobytes()).hexdigest()
+
+
+
+def get_index(segment):
+	"""
+	Return the MATRIX row index of the given segment. An unrecognised one is
+	mapped onto the row of the empty string.
+	"""
+	if segment in phoible.INDEX:
+		return phoible.INDEX[segment]
+
+	warnings.warn('phoible-pc: cannot recognise {}'.format(segment))
+	return phoible.INDEX['']
+
 
-	vectors = pca.fit_transform(list(phoible.SEGMENTS.values()))
 
-	for index, key in enumerate(phoible.SEGMENTS.keys()):
-		SEGMENTS[key] = list(vectors[index])
+def get_indices(segments):
+	"""
+	Return the 1d int array of the MATRIX row indices of the given segments.
+	The unrecognised ones are mapped onto the row of the empty string.
+	"""
+	return np.array([get_index(segment) for segment in segments], dtype=np.intp)
+
+
+
+def round_deltas(deltas):
+	"""
+	Round the given delta(s) to the nearest multiples of DELTA_STEP.
+	"""
+	return np.round(deltas / DELTA_STEP) * DELTA_STEP
+
+
+
+def calc_delta_matrix(phons_a, phons_b):
+	"""
+	Return the 2d float array of the deltas between each of the phonemes of
+	the first sequence and each of those of the second one, i.e. the negated
+	dot products of their PCA-reduced PHOIBLE feature vectors.
+	"""
+	vectors_a = MATRIX[get_indices(phons_a)].astype(np.float64)
+	vectors_b = MATRIX[get_indices(phons_b)].astype(np.float64)
+
+	return round_deltas(- np.dot(vectors_a, vectors_b.T))
 
 
 
 def calc_delta(phon_a, phon_b):
 	"""
 	Calculate the delta between two phonemes, i.e. the dot product of their
-	PHOIBLE feature vectors.
+	PCA-reduced PHOIBLE feature vectors.
 	"""
-	if phon_a in SEGMENTS:
-		vec_a = SEGMENTS[phon_a]
-	else:
-		warnings.warn('phoible-pc: cannot recognise {}'.format(phon_a))
-		vec_a = SEGMENTS['']
-
-	if phon_b in SEGMENTS:
-		vec_b = SEGMENTS[phon_b]
-	else:
-		warnings.warn('phoible-pc: cannot recognise {}'.format(phon_b))
-		vec_b = SEGMENTS['']
+	vector_a = MATRIX[get_index(phon_a)].astype(np.float64)
+	vector_b = MATRIX[get_index(phon_b)].astype(np.float64)
 
-	return - sum(map(operator.mul, vec_a, vec_b))
+	return float(round_deltas(- np.dot(vector_a, vector_b)))
@@ -1,88 +1,119 @@
-import collections
-import operator
+import functools
 import warnings
 
+import numpy as np
+
 from code.phon import phoible
 
 
 
+"""
+Max number of LangPair instances kept by get_lang_pair().
+"""
+CACHE_SIZE = 256
+
+
+
 class LangPair:
 	"""
+	The PHOIBLE feature vectors of the phonemes of a pair of inventories,
+	reduced to the features that are relevant for both inventories, and the
+	table of deltas between these phonemes.
 	"""
 
 	def __init__(self, inventory_a, inventory_b):
 		"""
 		Init the instance's props.
 		"""
-		self.features = self.get_features(inventory_a) \
-						& self.get_features(inventory_b)
+		mask = self.get_mask(inventory_a) & self.get_mask(inventory_b)
 
-		self.Vector = collections.namedtuple('Vector', sorted(self.features))
+		self.features = set([feature for feature, is_relevant
+					in zip(phoible.Vector._fields, mask) if is_relevant])
 
-		phonemes = inventory_a | inventory_b | set([''])
+		phonemes = sorted(inventory_a | inventory_b | set(['']))
 
-		self.SEGMENTS = {
-			phon: self.get_vector(phon) for phon in phonemes}
+		self.index = {phon: index for index, phon in enumerate(phonemes)}
 
+		indices = [phoible.INDEX.get(phon, phoible.INDEX[''])
+					for phon in phonemes]
+		self.vectors = phoible.MATRIX[indices][:, mask].astype(np.int32)
 
-	def get_features(self, inventory):
+		self.table = - np.dot(self.vectors, self.vectors.T)
+		self.deltas = self.table.tolist()
+
+
+	def get_mask(self, inventory):
 		"""
-		Return the set of PHOIBLE features (i.e. set of column names) that are
-		relevant for the given phoneme inventory (i.e. set of IPA segments).
+		Return the 1d bool array flagging the PHOIBLE features (i.e. the
+		columns of phoible.MATRIX) that are relevant for the given phoneme
+		inventory (i.e. set of IPA segments).
 		"""
-		features = set()
+		indices = [phoible.INDEX[segment]
+					for segment in inventory if segment in phoible.INDEX]
 
-		for segment in inventory:
-			try:
-				vector = phoible.SEGMENTS[segment]
-			except KeyError:
-				continue
+		return (phoible.MATRIX[indices] != 0).any(axis=0)
 
-			for feature in vector._fields:
-				if getattr(vector, feature) != 0:
-					features.add(feature)
 
-		return features
+	def get_index(self, phon):
+		"""
+		Return the row of self.deltas that corresponds to the given phoneme.
+		The unrecognised phonemes are mapped onto the row of the empty string.
+		"""
+		try:
+			return self.index[phon]
+		except KeyError:
+			warnings.warn('PHOIBLE-SUB: cannot recognise {}'.format(phon))
+			return self.index['']
 
 
-	def get_vector(self, phon):
+	def calc_delta(self, phon_a, phon_b):
 		"""
-		Make a self.Vector tuple for the given phoneme out of the respective
-		phoible.SEGMENTS tuple.
+		Calculate the delta between two phonemes.
 		"""
-		if phon not in phoible.SEGMENTS:
-			phon = ''
+		return self.deltas[self.get_index(phon_a)][self.get_index(phon_b)]
 
-		dict_all = phoible.SEGMENTS[phon]._asdict()
 
-		dict_relevant = {key: value
-				for key, value in dict_all.items() if key in self.features}
+	def calc_delta_matrix(self, phons_a, phons_b):
+		"""
+		Return the 2d int array of the deltas between each of the phonemes of
+		the first sequence and each of those of the second one.
+		"""
+		indices_a = [self.get_index(phon) for phon in phons_a]
+		indices_b = [self.get_index(phon) for phon in phons_b]
 
-		return self.Vector(**dict_relevant)
+		return self.table[np.ix_(indices_a, indices_b)]
 
 
-	def calc_delta(self, phon_a, phon_b):
-		"""
-		Calculate the delta between two phonemes.
-		"""
-		if phon_a in self.SEGMENTS:
-			vec_a = self.SEGMENTS[phon_a]
-		else:
-			warnings.warn('PHOIBLE-SUB: cannot recognise {}'.format(phon_a))
-			vec_a = self.SEGMENTS['']
 
-		if phon_b in self.SEGMENTS:
-			vec_b = self.SEGMENTS[phon_b]
-		else:
-			warnings.warn('PHOIBLE-SUB: cannot recognise {}'.format(phon_b))
-			vec_b = self.SEGMENTS['']
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _get_lang_pair(inventory_a, inventory_b):
+	return LangPair(inventory_a, inventory_b)
+
 
-		return - sum(map(operator.mul, vec_a, vec_b))
+
+def get_lang_pair(inventory_a, inventory_b):
+	"""
+	Return the LangPair instance for the given pair of phoneme inventories.
+	The instances are cached, so that the same pair of inventories is not
+	processed more than once.
+	"""
+	return _get_lang_pair(frozenset(inventory_a), frozenset(inventory_b))
+
+
+
+def get_fingerprint():
+	"""
+	Return the string identifying the loaded data; see phoible.get_fingerprint.
+	"""
+	return phoible.get_fingerprint()
 
 
 
 def load(path=phoible.DATA_PATH):
 	"""
-	Make sure that phoible.SEGMENTS is available.
+	Make sure that phoible.MATRIX is available.
 	"""
+	if phoible.LOADED_PATH != path:
+		_get_lang_pair.cache_clear()
+
 	phoible.load(path)
@@ -1,8 +1,10 @@
+import hashlib
 import warnings
 
-from gensim.models import Word2Vec
 from ipatok.ipa import is_letter, is_tie_bar
 
+import numpy as np
+
 
 
 """
@@ -36,6 +38,8 @@ def train(dataset_path, output_path=DEFAULT_MODEL_PATH,
 	Train phoneme embeddings using word2vec (with tokenised IPA string being
 	the "sentences") on a dataset and store the trained model.
 	"""
+	from gensim.models import Word2Vec
+
 	with open(dataset_path, encoding='utf-8') as f:
 		ipa_data = [[normalise_token(token) for token in line.strip().split()]
 					for line in f]
@@ -52,16 +56,39 @@ def train(dataset_path, output_path=DEFAULT_MODEL_PATH,
 				iter=5,  # number of epochs
 				null_word=True)  # reached by ['\0']
 
-	model.save(output_path)
+	# store all the arrays as separate .npy files, however small, so that
+	# load can memory-map them
+	model.save(output_path, sep_limit=0)
 
 
 
 def load(model_path=DEFAULT_MODEL_PATH):
 	"""
-	Load a trained word2vec model into model, the module-level var.
+	Load a trained word2vec model into model, the module-level var. The arrays
+	stored as separate .npy files alongside the model (all of them, if it was
+	saved by train) are memory-mapped, so that processes loading the same
+	model share them; models saved otherwise can be re-saved with
+	model.save(path, sep_limit=0) to benefit.
 	"""
 	global model
-	model = Word2Vec.load(model_path)
+
+	from gensim.models import Word2Vec
+	model = Word2Vec.load(model_path, mmap='r')
+
+
+
+def get_fingerprint():
+	"""
+	Return the string identifying the loaded model, i.e. the sha1 hex digest
+	of its vocab and vectors.
+	"""
+	h = hashlib.sha1()
+
+	for token in sorted(model.wv.vocab):
+		h.update(token.encode('utf-8') + b'\0')
+		h.update(np.ascontiguousarray(model.wv[token], dtype=np.float32).tobytes())
+
+	return h.hexdigest()
 
 
 
@@ -96,3 +123,35 @@ def calc_delta(phon_a, phon_b):
 	If model, the module-level var, is not inited, raise an exception.
 	"""
 	return model.wv.distance(get_vector_key(phon_a), get_vector_key(phon_b))
+
+
+
+def get_matrix(tokens):
+	"""
+	Return the 2d float array of the row-normalised skipgram embeddings of the
+	given phonemes. The key of each phoneme is resolved only once.
+	"""
+	keys = {}
+
+	for token in tokens:
+		if token not in keys:
+			keys[token] = get_vector_key(token)
+
+	vectors = np.array([model.wv[keys[token]] for token in tokens],
+						dtype=np.float64).reshape(len(tokens), -1)
+
+	norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+	norms[norms == 0] = 1
+
+	return vectors / norms
+
+
+
+def calc_delta_matrix(phons_a, phons_b):
+	"""
+	Return the 2d float array of the deltas between each of the phonemes of
+	the first sequence and each of those of the second one, i.e. the cosine
+	distances between their skipgram embeddings, computed as a single matrix
+	product.
+	"""
+	return 1 - np.dot(get_matrix(phons_a), get_matrix(phons_b).T)
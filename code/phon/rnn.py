@@ -1,23 +1,15 @@
 import os
-import pickle
 import random
 import warnings
 
 from ipatok.ipa import is_letter
 from ipatok import tokenise
 
-from keras.callbacks import TensorBoard
-from keras.layers import Dense, Embedding, Input, SimpleRNN
-from keras.models import Model
-from keras.preprocessing.sequence import pad_sequences
-from keras.utils import to_categorical
-
 import numpy as np
 
 from scipy.spatial.distance import cosine
 
-import tensorflow
-
+from code.phon import embeddings, nn
 from code.phon.nn import normalise_token
 
 
@@ -29,8 +21,9 @@ DEFAULT_MODEL_PATH = 'models/rnn'
 
 
 """
-Mapping from IPA tokens to their respective vector representations obtained in
-train(); inited in load() and used in get_vector() and calc_delta().
+Embeddings instance mapping IPA tokens to their respective vector
+representations obtained in train(); inited in load() and used in get_vector()
+and calc_delta().
 """
 VECTORS = None
 
@@ -67,17 +60,16 @@ def prepare_training_data(dataset_path):
 def prepare_initial_weights(model_path, tokens):
 	"""
 	Prepare initial weights for RNN model embedding layer. model_path should
-	point to a pickled dict mapping IPA tokens to vectors (usually the output
-	of training a context model). tokens should comprise the vocabulary being
-	embedded.
+	point to an embeddings model mapping IPA tokens to vectors (usually the
+	output of training a context model). tokens should comprise the vocabulary
+	being embedded.
 
 	The first three rows of the returned matrix are zeroes, reserved for the
 	padding and word boundaries non-tokens.
 	"""
 	weights = np.zeros((len(tokens)+3, 64))
 
-	with open(model_path, 'rb') as f:
-		model = pickle.load(f)
+	model = embeddings.load(model_path)
 
 	for index, token in enumerate(tokens, 3):
 		if token in model:
@@ -94,7 +86,13 @@ def make_model(vocab_size, initial_weights=None):
 	should be the total number of distinct tokens, including for padding (0)
 	and word start (1) and end (2). The second arg allows setting the initial
 	weights of the embedding layer.
+
+	Keras is imported here and in the other training funcs rather than at
+	module level, as it is not needed for using an already trained model.
 	"""
+	from keras.layers import Dense, Embedding, Input, SimpleRNN
+	from keras.models import Model
+
 	if initial_weights is not None:
 		embed = Embedding(
 					input_dim=vocab_size, output_dim=64, mask_zero=True,
@@ -129,6 +127,8 @@ def make_callbacks(tokens, tensorboard_dir):
 	Init and return (in a list) a TensorBoard Keras callback instance to be
 	used for visualising the token embeddings.
 	"""
+	from keras.callbacks import TensorBoard
+
 	try:
 		os.makedirs(tensorboard_dir, exist_ok=True)
 	except OSError as err:
@@ -154,8 +154,13 @@ def train(dataset_path, output_path=DEFAULT_MODEL_PATH, from_model=None,
 					tensorboard_dir=None, epochs=5, batch_size=32, seed=42):
 	"""
 	Train IPA token embeddings using an RNN-powered sequence-to-sequence model
-	and pickle the obtained vector representations.
+	and store the obtained vector representations.
 	"""
+	from keras.preprocessing.sequence import pad_sequences
+	from keras.utils import to_categorical
+
+	import tensorflow
+
 	random.seed(seed)
 	np.random.seed(seed)
 	tensorflow.set_random_seed(seed)
@@ -188,27 +193,32 @@ def train(dataset_path, output_path=DEFAULT_MODEL_PATH, from_model=None,
 	vectors = {token: weights[index+3] for index, token in enumerate(tokens)}
 
 	if from_model:
-		with open(from_model, 'rb') as f:
-			base_vectors = pickle.load(f)
+		base_vectors = embeddings.load(from_model)
 
 		for token, vector in base_vectors.items():
 			if token not in vectors:
 				vectors[token] = vector
 
-	with open(output_path, 'wb') as f:
-		pickle.dump(vectors, f, protocol=3)
+	embeddings.save(vectors, output_path)
 
 
 
 def load(model=DEFAULT_MODEL_PATH):
 	"""
-	Load a model; this should be a pickled dict mapping IPA tokens to vector
-	representations.
+	Load a model, i.e. the embeddings stored by train(); the format is
+	described in code.phon.embeddings.
 	"""
 	global VECTORS
+	VECTORS = embeddings.load(model)
+
 
-	with open(model, 'rb') as f:
-		VECTORS = pickle.load(f)
+
+def get_fingerprint():
+	"""
+	Return the string identifying the loaded model, i.e. the hash of its
+	embeddings.
+	"""
+	return VECTORS.get_hash()
 
 
 
@@ -264,3 +274,13 @@ def calc_delta(phon_a, phon_b):
 		return 1
 
 	return cosine(vec_a, vec_b)
+
+
+
+def calc_delta_matrix(phons_a, phons_b):
+	"""
+	Return the 2d float array of the deltas between each of the phonemes of
+	the first sequence and each of those of the second one, i.e. the cosine
+	distances between their vector representations; see nn.calc_delta_matrix.
+	"""
+	return nn.calc_delta_matrix(phons_a, phons_b, get_vector, VECTORS.size)
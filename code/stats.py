@@ -0,0 +1,197 @@
+import collections
+import contextlib
+import cProfile
+import json
+import sys
+import time
+
+try:
+	import resource
+except ImportError:  # not available on windows
+	resource = None
+
+
+
+class Stats:
+	"""
+	Collects the wall and CPU time spent in each stage of a run, as well as
+	counters of the work done in it (e.g. word pairs aligned, DP cells filled).
+
+	Stages can be nested, in which case the time is only counted towards the
+	innermost one; so that the stages of a generator pipeline can be told
+	apart, e.g. the aligning of word pairs from the writing of the output that
+	consumes the alignments as they are generated.
+
+	Basic usage:
+
+		stats = Stats()
+
+		with stats.stage('read'):
+			dataset = init_dataset(path)
+
+		stats.count('pairs', 42)
+		stats.write()
+	"""
+
+	def __init__(self):
+		"""
+		Init the instance's props.
+		"""
+		self.stages = collections.OrderedDict()  # name: [wall, cpu]
+		self.counters = collections.Counter()
+
+		self._stack = []
+		self._mark = None
+
+
+	def _charge(self):
+		"""
+		Add the time elapsed since the last call to the innermost running
+		stage, if any.
+		"""
+		now = time.perf_counter(), time.process_time()
+
+		if self._stack:
+			times = self.stages[self._stack[-1]]
+			times[0] += now[0] - self._mark[0]
+			times[1] += now[1] - self._mark[1]
+
+		self._mark = now
+
+
+	@contextlib.contextmanager
+	def stage(self, name):
+		"""
+		Context manager that counts the time spent within it towards the
+		stage of the given name, pausing the enclosing stage (if any). A
+		stage can be entered any number of times, the times add up.
+		"""
+		self.stages.setdefault(name, [0.0, 0.0])
+
+		self._charge()
+		self._stack.append(name)
+
+		try:
+			yield
+		finally:
+			self._charge()
+			self._stack.pop()
+
+
+	def iter_stage(self, name, iterable):
+		"""
+		Generate the items of the iterable, counting the time spent producing
+		each of them towards the stage of the given name.
+		"""
+		iterator = iter(iterable)
+
+		while True:
+			with self.stage(name):
+				try:
+					item = next(iterator)
+				except StopIteration:
+					return
+
+			yield item
+
+
+	def count(self, name, num=1):
+		"""
+		Add the given number to the counter of the given name.
+		"""
+		self.counters[name] += num
+
+
+	def get_peak_rss(self):
+		"""
+		Return the peak resident set size of the process (or of the largest of
+		its finished child processes, if that is larger) in bytes, or None if
+		the platform does not provide it.
+		"""
+		if resource is None:
+			return None
+
+		peak = max(
+			resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+			resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+		# linux reports kilobytes, macos bytes
+		return peak if sys.platform == 'darwin' else peak * 1024
+
+
+	def to_dict(self):
+		"""
+		Return the collected stats as a json-serialisable dict. If there is an
+		align stage and a pairs counter, the pairs per second of the former's
+		wall time are included as well.
+		"""
+		res = {
+			'stages': {
+				name: {'wall': wall, 'cpu': cpu}
+				for name, (wall, cpu) in self.stages.items()},
+			'counters': dict(self.counters),
+			'peak_rss': self.get_peak_rss() }
+
+		if self.stages.get('align', [0])[0] > 0 and 'pairs' in self.counters:
+			res['pairs_per_sec'] = self.counters['pairs'] / self.stages['align'][0]
+
+		return res
+
+
+	def format(self):
+		"""
+		Return the collected stats as a human-readable multiline string.
+		"""
+		data = self.to_dict()
+		lines = []
+
+		for name, times in data['stages'].items():
+			lines.append('{:<16} {:>9.3f}s wall {:>9.3f}s cpu'.format(
+				name, times['wall'], times['cpu']))
+
+		for name, value in sorted(data['counters'].items()):
+			lines.append('{:<16} {:>10}'.format(name, value))
+
+		if 'pairs_per_sec' in data:
+			lines.append('{:<16} {:>10.1f}'.format(
+				'pairs/s', data['pairs_per_sec']))
+
+		if data['peak_rss'] is not None:
+			lines.append('{:<16} {:>10.1f} MiB'.format(
+				'peak rss', data['peak_rss'] / 2**20))
+
+		return '\n'.join(lines)
+
+
+	def write(self, path=None):
+		"""
+		Write the collected stats to the given path as json or, if the path is
+		None or - (a hyphen), to stderr in human-readable form.
+		"""
+		if path is None or path == '-':
+			print(self.format(), file=sys.stderr)
+		else:
+			with open(path, 'w', encoding='utf-8') as f:
+				json.dump(self.to_dict(), f, indent=4)
+
+
+
+@contextlib.contextmanager
+def profile(path=None):
+	"""
+	Context manager that runs the code within it under cProfile. The stats are
+	dumped into the file at the given path, in the format of pstats, or, if
+	the path is None, nothing is done at all.
+	"""
+	if path is None:
+		yield
+		return
+
+	profiler = cProfile.Profile()
+	profiler.enable()
+
+	try:
+		yield
+	finally:
+		profiler.disable()
+		profiler.dump_stats(path)
@@ -1,11 +1,21 @@
 from unittest import TestCase
+from unittest.mock import patch
 
 import editdistance
 
-from hypothesis.strategies import text
+from hypothesis.strategies import integers, lists, text, tuples
 from hypothesis import given
 
-from code.align import Alignment, simple_align, merge_align
+from code.phon.base import CostMatrix
+from code.align import (
+		Alignment, simple_align, merge_align,
+		wavefront_align, wavefront_merge_align,
+		banded_align, banded_merge_align,
+		batch_simple_align, batch_merge_align,
+		bitparallel_align, bitparallel_score,
+		simple_score, score_align, hirschberg_align,
+		cutoff_align, cutoff_score, align_pairs,
+		within_distance, get_length_bound)
 
 
 
@@ -36,6 +46,24 @@ class AlignTestCase(TestCase):
 		self.assertEqual(len(res), 1)
 		self.assertTrue(Alignment(1, (('з', 'з'), (('а', 'м'), 'ъ'), ('б', 'б'))) in res)
 
+	def test_max_alignments(self):
+		cost_func = lambda a, b: -1 if a == b else 1
+		res = simple_align('GCATGCU', 'GATTACA', cost_func)
+
+		for max_alignments in [1, 2, 3, 4]:
+			res_max = simple_align(
+						'GCATGCU', 'GATTACA', cost_func, max_alignments)
+			self.assertEqual(len(res_max), min(max_alignments, len(res)))
+			self.assertTrue(res_max <= res)
+
+		word_a, word_b = 'ab' * 100, 'ba' * 100
+		res = simple_align(word_a, word_b, cost_func, max_alignments=1)
+		self.assertEqual(len(res), 1)
+		self.assertEqual(list(res)[0].delta, -197)
+
+		res_banded = banded_align(word_a, word_b, cost_func, max_alignments=1)
+		self.assertEqual(res_banded, res)
+
 	@given(text(max_size=10), text(max_size=10))
 	def test_simple_align_distance(self, word_a, word_b):
 		res = simple_align(word_a, word_b, lambda a, b: 0 if a == b else 1)
@@ -43,3 +71,127 @@ class AlignTestCase(TestCase):
 
 		delta = list(res)[0].delta
 		self.assertEqual(delta, editdistance.eval(word_a, word_b))
+
+	@given(text(max_size=8), text(max_size=8))
+	def test_wavefront_align(self, word_a, word_b):
+		cost_func = lambda a, b: -1 if a == b else 1
+
+		self.assertEqual(
+			wavefront_align(word_a, word_b, cost_func),
+			simple_align(word_a, word_b, cost_func))
+
+		self.assertEqual(
+			wavefront_merge_align(word_a, word_b, cost_func),
+			merge_align(word_a, word_b, cost_func))
+
+	@patch('code.align.BAND_MIN_LENGTH', 0)
+	@given(text(max_size=10), text(max_size=10))
+	def test_banded_align(self, word_a, word_b):
+		for cost_func in [
+				lambda a, b: -1 if a == b else 1,
+				lambda a, b: (-2 if a == b else 1) if a and b else 2]:
+			self.assertEqual(
+				banded_align(word_a, word_b, cost_func),
+				simple_align(word_a, word_b, cost_func))
+
+			self.assertEqual(
+				banded_merge_align(word_a[:6], word_b[:6], cost_func),
+				merge_align(word_a[:6], word_b[:6], cost_func))
+
+	@given(lists(tuples(text(max_size=6), text(max_size=6)), max_size=5))
+	def test_batch_align(self, pairs):
+		cost_func = lambda a, b: -1 if a == b else 1
+
+		self.assertEqual(
+			batch_simple_align(pairs, cost_func),
+			[simple_align(word_a, word_b, cost_func) for word_a, word_b in pairs])
+
+		self.assertEqual(
+			batch_merge_align(pairs, cost_func),
+			[merge_align(word_a, word_b, cost_func) for word_a, word_b in pairs])
+
+	@given(text(max_size=10), text(max_size=10))
+	def test_linear_memory_align(self, word_a, word_b):
+		cost_func = lambda a, b: -1 if a == b else 1
+		res = simple_align(word_a, word_b, cost_func)
+
+		self.assertEqual(
+			simple_score(word_a, word_b, cost_func), list(res)[0].delta)
+
+		res_hirschberg = hirschberg_align(word_a, word_b, cost_func)
+		self.assertEqual(len(res_hirschberg), 1)
+		self.assertTrue(res_hirschberg <= res)
+
+	@given(lists(tuples(text(max_size=5), text(max_size=5)), max_size=3))
+	def test_cost_matrix(self, pairs):
+		cost_func = lambda a, b: 0 if a == b else len(a) + len(b)
+		cost_matrix = CostMatrix.tabulate(cost_func,
+						set([elem for word_a, _ in pairs for elem in word_a]),
+						set([elem for _, word_b in pairs for elem in word_b]))
+
+		for word_a, word_b in pairs:
+			self.assertEqual(
+				wavefront_align(word_a, word_b, cost_matrix),
+				simple_align(word_a, word_b, cost_func))
+
+		self.assertEqual(
+			batch_merge_align(pairs, cost_matrix),
+			[merge_align(word_a, word_b, cost_func) for word_a, word_b in pairs])
+
+	@given(lists(tuples(text(max_size=8), text(max_size=8)), max_size=12))
+	def test_bitparallel_align(self, pairs):
+		cost_func = lambda a, b: 1 if a == '' or b == '' or a != b else -1
+		cost_matrix = CostMatrix.tabulate(cost_func,
+						set([elem for word_a, _ in pairs for elem in word_a]),
+						set([elem for _, word_b in pairs for elem in word_b]),
+						unit_costs=(-1, 1, 1))
+
+		self.assertEqual(
+			bitparallel_align(pairs, cost_matrix),
+			[simple_align(word_a, word_b, cost_func) for word_a, word_b in pairs])
+
+		self.assertEqual(
+			bitparallel_score(pairs, cost_matrix),
+			[score_align(word_a, word_b, cost_func) for word_a, word_b in pairs])
+
+	@given(lists(tuples(text(max_size=8), text(max_size=8)), max_size=10),
+			integers(min_value=-8, max_value=8))
+	def test_cutoff_align(self, pairs, max_cost):
+		cost_func = lambda a, b: (-2 if a == b else 1) if a and b else 2
+		cost_matrix = CostMatrix.tabulate(cost_func,
+						set([elem for word_a, _ in pairs for elem in word_a]),
+						set([elem for _, word_b in pairs for elem in word_b]))
+		length_bound = get_length_bound(cost_matrix)
+
+		for word_a, word_b in pairs:
+			res = simple_align(word_a, word_b, cost_func, max_alignments=20)
+			delta = list(res)[0].delta
+
+			if length_bound is not None:
+				self.assertLessEqual(
+					length_bound(len(word_a), len(word_b)), delta)
+
+			self.assertEqual(
+				cutoff_score(word_a, word_b, cost_matrix, max_cost),
+				delta if delta <= max_cost else None)
+			self.assertEqual(
+				cutoff_align(word_a, word_b, cost_func, max_cost, 20),
+				res if delta <= max_cost else frozenset())
+
+		self.assertEqual(
+			align_pairs(pairs, simple_align, cost_matrix, max_cost),
+			[cutoff_align(word_a, word_b, cost_func, max_cost)
+				for word_a, word_b in pairs])
+
+		self.assertEqual(
+			align_pairs(pairs, merge_align, cost_matrix, max_cost),
+			[frozenset([alignment for alignment in merge_align(
+					word_a, word_b, cost_func) if alignment.delta <= max_cost])
+				for word_a, word_b in pairs])
+
+	@given(text(max_size=10), text(max_size=10), integers(min_value=0, max_value=10))
+	def test_within_distance(self, word_a, word_b, max_dist):
+		dist = editdistance.eval(word_a, word_b)
+
+		self.assertEqual(within_distance(word_a, word_b, max_dist),
+						dist <= max_dist)
@@ -0,0 +1,50 @@
+import os
+import stat
+import tempfile
+
+from unittest import TestCase
+
+from code.align import simple_align
+from code.cache import AlignmentCache
+
+
+
+class AlignmentCacheTestCase(TestCase):
+
+	def setUp(self):
+		self.cost_func = lambda a, b: 0 if a == b else 1
+
+	def test_memory(self):
+		cache = AlignmentCache(('test',), max_size=2)
+		self.assertIsNone(cache.get('abc', 'abd'))
+
+		for pair in [('abc', 'abd'), ('ab', 'ba'), ('a', 'b')]:
+			cache.set(*pair, simple_align(*pair, self.cost_func))
+
+		self.assertIsNone(cache.get('abc', 'abd'))
+		self.assertEqual(cache.get('ab', 'ba'), simple_align('ab', 'ba', self.cost_func))
+		self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+	def test_disk(self):
+		with tempfile.TemporaryDirectory() as temp_dir:
+			res = simple_align('abc', 'abd', self.cost_func)
+
+			cache = AlignmentCache(('test',), cache_dir=temp_dir)
+			cache.set('abc', 'abd', res)
+
+			cache = AlignmentCache(('test',), cache_dir=temp_dir)
+			self.assertEqual(cache.get('abc', 'abd'), res)
+
+			cache = AlignmentCache(('other',), cache_dir=temp_dir)
+			self.assertIsNone(cache.get('abc', 'abd'))
+
+	def test_disk_permissions(self):
+		umask = os.umask(0o022)
+		self.addCleanup(os.umask, umask)
+
+		with tempfile.TemporaryDirectory() as temp_dir:
+			cache = AlignmentCache(('test',), cache_dir=temp_dir)
+			cache.set('abc', 'abd', simple_align('abc', 'abd', self.cost_func))
+
+			mode = os.stat(cache.get_path('abc', 'abd')).st_mode
+			self.assertEqual(stat.S_IMODE(mode), 0o644)
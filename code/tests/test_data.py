@@ -9,9 +9,11 @@ from unittest import TestCase, skip
 from hypothesis.strategies import composite, lists, sets, text
 from hypothesis import assume, given
 
+from code import align
 from code.data import (
 		Word, Alignment, DatasetError,
-		WordsDataset, AlignmentsDataset, write_words)
+		WordsDataset, AlignmentsDataset,
+		write_words, write_alignments, write_scores)
 
 
 
@@ -87,6 +89,28 @@ class WordsDatasetTestCase(TestCase):
 				dataset = WordsDataset(path, dialect, is_tokenised=True)
 				self.assertEqual(dataset.words, words)
 
+	@given(words())
+	def test_get_word_pairs(self, words):
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'dataset.tsv')
+			write_words(words, path, tokenised=True)
+			dataset = WordsDataset(path, is_tokenised=True)
+
+		langs = sorted(set([word.lang for word in words]))
+		self.assertEqual(dataset.get_langs(), langs)
+
+		index = {}
+		for word in words:
+			index.setdefault((word.lang, word.concept), set()).add(word)
+
+		for lang_a, lang_b in itertools.combinations(langs, 2):
+			pairs = dataset.get_word_pairs(lang_a, lang_b)
+
+			self.assertEqual(len(pairs), len(set(pairs)))
+			self.assertEqual(set(pairs), set([
+				(word_a, word_b) for word_a in words if word_a.lang == lang_a
+				for word_b in index.get((lang_b, word_a.concept), [])]))
+
 
 
 class AlignmentsDatasetTestCase(TestCase):
@@ -128,3 +152,64 @@ class AlignmentsDatasetTestCase(TestCase):
 			(satəm, kentum): set([Alignment(
 				(('s', 'k'), ('a', 'e'), ('', 'n'), ('t', 't'), ('ə', 'u'), ('m', 'm')),
 				'centum/satəm')])})
+
+
+
+class WriteTestCase(TestCase):
+
+	def setUp(self):
+		self.kentum = Word('Latin', 'hundred', ('k', 'e', 'n', 't', 'u', 'm'))
+		self.satəm = Word('Iranian', 'hundred', ('s', 'a', 't', 'ə', 'm'))
+
+		self.corr = (
+			('k', 's'), ('e', 'a'), ('n', ''), ('t', 't'), ('u', 'ə'), ('m', 'm'))
+
+	def test_write_alignments(self):
+		def gen():
+			yield self.kentum, self.satəm, Alignment(self.corr, 'centum/satəm')
+			yield self.kentum, self.satəm, align.Alignment(2, self.corr)
+
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'output.psa')
+			write_alignments(gen(), path, 'TEST')
+
+			with open(path, encoding='utf-8') as f:
+				self.assertEqual(f.read(), '\n'.join([
+					'TEST',
+					'centum/satəm',
+					'Latin..\tk\te\tn\tt\tu\tm',
+					'Iranian\ts\ta\t-\tt\tə\tm',
+					'',
+					'hundred',
+					'Latin..\tk\te\tn\tt\tu\tm',
+					'Iranian\ts\ta\t-\tt\tə\tm',
+					'']))
+
+	def test_write_and_load_alignments(self):
+		dataset = AlignmentsDataset(COVINGTON_DATASET_PATH)
+
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'output.psa')
+			write_alignments((entry for entry in dataset.data), path, dataset.header)
+
+			dataset_out = AlignmentsDataset(path)
+
+		self.assertEqual(dataset_out.header, dataset.header)
+		self.assertEqual(dataset_out.data, dataset.data)
+
+	def test_write_scores(self):
+		def gen():
+			yield self.kentum, self.satəm, align.Alignment(-1.5, None)
+			yield self.satəm, self.kentum, align.Alignment(2, None)
+
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'output.tsv')
+			write_scores(gen(), path)
+
+			with open(path, encoding='utf-8', newline='') as f:
+				rows = list(csv.reader(f, dialect='excel-tab'))
+
+		self.assertEqual(rows, [
+			['language_a', 'ipa_a', 'language_b', 'ipa_b', 'delta'],
+			['Latin', 'k e n t u m', 'Iranian', 's a t ə m', '-1.5'],
+			['Iranian', 's a t ə m', 'Latin', 'k e n t u m', '2']])
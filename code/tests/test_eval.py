@@ -0,0 +1,58 @@
+import os.path
+import tempfile
+
+from unittest import TestCase
+
+from code.align import merge_align
+from code.data import AlignmentsDataset, write_alignments
+from code.eval import evaluate
+from code.main import main
+from code.phon.base import Phon
+
+
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '../..')
+COVINGTON_DATASET_PATH = os.path.join(BASE_DIR, 'data/bdpa/covington.psa')
+
+
+
+class EvalTestCase(TestCase):
+
+	def setUp(self):
+		self.dataset = AlignmentsDataset(COVINGTON_DATASET_PATH)
+
+	def test_evaluate_gold(self):
+		evaluation = evaluate(self.dataset, self.dataset)
+
+		self.assertEqual(evaluation.mistakes, [])
+		self.assertEqual(evaluation.num_correct, evaluation.num_total)
+		self.assertEqual(evaluation.score, evaluation.num_total)
+
+	def test_evaluate_merge_output(self):
+		alignments = list(main(self.dataset, merge_align, Phon('one-hot')))
+
+		self.assertTrue(any([
+			isinstance(token, tuple)
+			for _, _, alignment in alignments
+			for pair in alignment.corr for token in pair]))
+
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'output.psa')
+			write_alignments(alignments, path)
+			dataset_pred = AlignmentsDataset(path)
+
+		self.assertEqual(
+			set([(word_a.ipa, word_b.ipa) for word_a, word_b, _ in dataset_pred.data]),
+			set([(word_a.ipa, word_b.ipa) for word_a, word_b, _ in self.dataset.data]))
+
+		corrs = set([alignment.corr for _, _, alignment in alignments])
+		self.assertTrue(all([
+			alignment.corr in corrs
+			or self.dataset._reverse_alignment(alignment).corr in corrs
+			for _, _, alignment in dataset_pred.data]))
+
+		evaluation = evaluate(self.dataset, dataset_pred)
+
+		self.assertEqual(evaluation.num_total, len(set([
+			(word_a, word_b) for word_a, word_b, _ in dataset_pred.data])))
+		self.assertLess(evaluation.num_correct, evaluation.num_total)
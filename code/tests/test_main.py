@@ -0,0 +1,51 @@
+import os.path
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from code.align import simple_align
+from code.cache import AlignmentCache
+from code.data import AlignmentsDataset
+from code.main import main
+from code.phon.base import Phon
+from code.stats import Stats
+
+
+
+BASE_DIR = os.path.join(os.path.dirname(__file__), '../..')
+COVINGTON_DATASET_PATH = os.path.join(BASE_DIR, 'data/bdpa/covington.psa')
+
+
+
+class MainTestCase(TestCase):
+
+	def setUp(self):
+		self.dataset = AlignmentsDataset(COVINGTON_DATASET_PATH)
+
+		self.phon = Phon('one-hot')
+		self.phon.load()
+
+	def run_main(self, jobs):
+		cache = AlignmentCache(('test',))
+		stats = Stats()
+
+		output = list(main(self.dataset, simple_align, self.phon, jobs,
+				cache, stats=stats))
+
+		return output, cache, stats
+
+	def test_jobs(self):
+		output, cache, stats = self.run_main(1)
+		self.assertTrue(output)
+
+		with patch('code.main.MAX_PENDING_PER_JOB', 1):
+			output_jobs, cache_jobs, stats_jobs = self.run_main(2)
+
+		self.assertEqual(output_jobs, output)
+
+		self.assertEqual(
+			cache_jobs.hits + cache_jobs.misses, cache.hits + cache.misses)
+		self.assertGreater(cache_jobs.misses, 0)
+
+		self.assertEqual(stats_jobs.counters['alignments'], len(output))
+		self.assertEqual(stats.counters['alignments'], len(output))
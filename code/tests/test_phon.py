@@ -0,0 +1,354 @@
+import operator
+import os
+import os.path
+import pickle
+import shutil
+import tempfile
+import warnings
+
+import numpy as np
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from code.phon import (
+		embeddings, nn, one_hot, phoible, phoible_pc, phoible_sub, rnn)
+from code.align import simple_align
+from code.phon.base import CostMatrix, Phon
+
+
+
+class PhonTestCase(TestCase):
+
+	def test_get_cost_matrix(self):
+		inventory_a = set(['p', 'a', 't͡ʃ', 'ʘ'])
+		inventory_b = set(['b', 'ə', 'k', 'ʃ', 'a'])
+
+		for module_id in ['one-hot', 'phoible', 'phoible_sub']:
+			phon = Phon(module_id)
+			phon.load()
+
+			cost_func = phon.get_cost_func(inventory_a, inventory_b)
+
+			with warnings.catch_warnings():
+				warnings.simplefilter('ignore')
+				cost_matrix = phon.get_cost_matrix(inventory_a, inventory_b)
+				expected = CostMatrix.tabulate(
+						cost_func, inventory_a, inventory_b)
+
+			self.assertEqual(cost_matrix.tokens_a, expected.tokens_a)
+			self.assertEqual(cost_matrix.tokens_b, expected.tokens_b)
+			self.assertTrue((cost_matrix.table == expected.table).all())
+
+			self.assertEqual(cost_matrix.sub.shape, (4, 5))
+			self.assertEqual(cost_matrix.indel_a.tolist(),
+					cost_matrix.table[1:, 0].tolist())
+			self.assertEqual(cost_matrix.indel_b.tolist(),
+					cost_matrix.table[0, 1:].tolist())
+
+	def test_one_hot(self):
+		phons_a = ['p', 'a', '', ('a', 'b')]
+		phons_b = ['a', '', 'p', ('a', 'b'), 'k']
+
+		matrix = one_hot.calc_delta_matrix(phons_a, phons_b)
+		self.assertEqual(matrix.shape, (4, 5))
+
+		for index_a, phon_a in enumerate(phons_a):
+			for index_b, phon_b in enumerate(phons_b):
+				self.assertEqual(matrix[index_a, index_b],
+						one_hot.calc_delta(phon_a, phon_b))
+
+		phon = Phon('one-hot')
+		cost_matrix = phon.get_cost_matrix(set(['p', 'a']), set(['a', 'k']))
+		self.assertEqual(cost_matrix.unit_costs, one_hot.UNIT_COSTS)
+
+
+
+class PhoibleTestCase(TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		phoible.load()
+
+	def test_calc_delta_matrix(self):
+		phons_a = ['p', 'a', 't͡ʃ', '']
+		phons_b = ['b', 'ə', 'k', 'ʃ', '']
+
+		matrix = phoible.calc_delta_matrix(phons_a, phons_b)
+		self.assertEqual(matrix.shape, (4, 5))
+
+		for index_a, phon_a in enumerate(phons_a):
+			for index_b, phon_b in enumerate(phons_b):
+				delta = - sum(map(operator.mul,
+						phoible.SEGMENTS[phon_a], phoible.SEGMENTS[phon_b]))
+				self.assertEqual(matrix[index_a, index_b], delta)
+				self.assertEqual(phoible.calc_delta(phon_a, phon_b), delta)
+
+	def test_fingerprint(self):
+		fingerprint = phoible.get_fingerprint()
+		self.assertEqual(fingerprint, phoible.get_fingerprint())
+		self.assertEqual(fingerprint, Phon('phoible').get_fingerprint())
+		self.assertIsNone(Phon('one-hot').get_fingerprint())
+
+	def test_unrecognised(self):
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter('always')
+			self.assertEqual(phoible.calc_delta('p', ('a', 'b')), 0)
+
+		self.assertEqual(len(caught), 1)
+
+	def test_segments(self):
+		self.assertIn('', phoible.SEGMENTS)
+		self.assertNotIn('xyz', phoible.SEGMENTS)
+		self.assertEqual(len(phoible.SEGMENTS), phoible.MATRIX.shape[0])
+
+		self.assertEqual(list(phoible.SEGMENTS)[-1], '')
+		self.assertTrue(all([value == 0 for value in phoible.SEGMENTS['']]))
+
+		vector = phoible.SEGMENTS['p']
+		self.assertEqual(vector._fields, phoible.Vector._fields)
+		self.assertEqual(list(vector),
+				phoible.MATRIX[phoible.INDEX['p']].tolist())
+
+	def test_binary_cache(self):
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'phoible.tsv')
+			shutil.copyfile(phoible.DATA_PATH, path)
+
+			features, segments, matrix = phoible.parse_dataset(path)
+			self.assertEqual(matrix.shape, (len(segments), len(features)))
+
+			with self.assertRaises(OSError):
+				phoible.read_cache(path)
+
+			phoible.write_cache(path, features, segments, matrix)
+			cached = phoible.read_cache(path)
+
+			self.assertEqual(cached[0], features)
+			self.assertEqual(cached[1], segments)
+			self.assertTrue((cached[2] == matrix).all())
+
+			mtime = os.stat(path).st_mtime + 60
+			os.utime(path, (mtime, mtime))
+
+			with patch('code.phon.phoible.get_source_info',
+					wraps=phoible.get_source_info) as get_source_info:
+				phoible.read_cache(path)
+				self.assertEqual(get_source_info.call_count, 2)
+
+				phoible.read_cache(path)
+				self.assertEqual(get_source_info.call_count, 3)
+
+			with open(path, 'a', encoding='utf-8') as f:
+				f.write('x' + '\t0' * len(features) + '\n')
+
+			with self.assertRaises(ValueError):
+				phoible.read_cache(path)
+
+
+
+class PhoibleSubTestCase(TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		phoible_sub.load()
+
+	def test_calc_delta(self):
+		inventory_a = set(['p', 'a', 't͡ʃ'])
+		inventory_b = set(['b', 'ə', 'k', 'ʃ'])
+
+		pair = phoible_sub.LangPair(inventory_a, inventory_b)
+
+		for phon_a in inventory_a | set(['']):
+			for phon_b in inventory_b | set(['']):
+				vec_a = phoible.SEGMENTS[phon_a]
+				vec_b = phoible.SEGMENTS[phon_b]
+
+				delta = - sum([getattr(vec_a, feature) * getattr(vec_b, feature)
+							for feature in pair.features])
+				self.assertEqual(pair.calc_delta(phon_a, phon_b), delta)
+
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter('always')
+			self.assertEqual(pair.calc_delta('p', ('a', 'b')), 0)
+
+		self.assertEqual(len(caught), 1)
+
+	def test_get_lang_pair(self):
+		pair = phoible_sub.get_lang_pair(set(['p', 'a']), set(['b', 'a']))
+
+		self.assertIs(phoible_sub.get_lang_pair(
+				frozenset(['a', 'p']), set(['a', 'b'])), pair)
+		self.assertIsNot(phoible_sub.get_lang_pair(
+				set(['b', 'a']), set(['p', 'a'])), pair)
+
+
+
+class PhoiblePcTestCase(TestCase):
+
+	def tearDown(self):
+		phoible.load()
+
+	def test_cached_projection(self):
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'phoible.tsv')
+			shutil.copyfile(phoible.DATA_PATH, path)
+			phoible.load(path)
+
+			cache_path = phoible_pc.get_cache_path(path, 3, 42)
+			self.assertEqual(os.path.dirname(cache_path), temp_dir)
+			self.assertNotEqual(
+					cache_path, phoible_pc.get_cache_path(path, 3, 1))
+
+			vectors = np.random.RandomState(42).rand(
+					phoible.MATRIX.shape[0], 3).astype(np.float32)
+			phoible_pc.write_cache(cache_path,
+					np.zeros((3, phoible.MATRIX.shape[1])), np.zeros(3), vectors)
+
+			phoible_pc.load(path, n_components=3, random_state=42)
+
+		self.assertEqual(phoible_pc.MATRIX.dtype, np.float32)
+		self.assertTrue((phoible_pc.MATRIX == vectors).all())
+
+		phons_a = ['p', 'a', '']
+		phons_b = ['b', 'ə', 'k', '']
+
+		matrix = phoible_pc.calc_delta_matrix(phons_a, phons_b)
+		self.assertEqual(matrix.shape, (3, 4))
+
+		for index_a, phon_a in enumerate(phons_a):
+			for index_b, phon_b in enumerate(phons_b):
+				delta = phoible_pc.round_deltas(- np.dot(
+						vectors[phoible.INDEX[phon_a]].astype(np.float64),
+						vectors[phoible.INDEX[phon_b]].astype(np.float64)))
+				self.assertEqual(matrix[index_a, index_b], delta)
+				self.assertEqual(phoible_pc.calc_delta(phon_a, phon_b), delta)
+
+	def test_ties(self):
+		phoible_pc.load()
+
+		def calc_delta(phon_a, phon_b):
+			vec_a = phoible_pc.MATRIX[phoible.INDEX[phon_a]].astype(np.float64)
+			vec_b = phoible_pc.MATRIX[phoible.INDEX[phon_b]].astype(np.float64)
+			return phoible_pc.round_deltas(
+					- sum(map(operator.mul, vec_a.tolist(), vec_b.tolist())))
+
+		word_a, word_b = ('j', 'e', 'n', '˧'), ('ɲ', 'i', '˨')
+
+		phon = Phon('phoible-pc')
+		cost_func = phon.get_cost_matrix(set(word_a), set(word_b))
+
+		res = simple_align(word_a, word_b, cost_func)
+		self.assertEqual(res, simple_align(word_a, word_b, calc_delta))
+
+		# the indels at the end of the words can come in any order
+		self.assertEqual(len(res), 3)
+
+
+
+class EmbeddingsTestCase(TestCase):
+
+	def setUp(self):
+		self.vectors = {token: np.random.rand(4).astype(np.float32)
+						for token in ['', 'p', 'a', 't͡ʃ']}
+
+	def test_save_and_load(self):
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'models/nn')
+			embeddings.save(self.vectors, path)
+
+			for model_path in [path, path + '.npy']:
+				model = embeddings.load(model_path)
+
+				self.assertIsInstance(model.matrix, np.memmap)
+				self.assertEqual(model.matrix.dtype, np.float32)
+				self.assertEqual(model.size, 4)
+
+				self.assertEqual(set(model), set(self.vectors))
+				self.assertNotIn('b', model)
+
+				for token, vector in self.vectors.items():
+					self.assertTrue((model[token] == vector).all())
+
+				del model
+
+	def test_get_hash(self):
+		model = embeddings.Embeddings.from_dict(self.vectors)
+		same = embeddings.Embeddings.from_dict(dict(self.vectors))
+		self.assertEqual(model.get_hash(), same.get_hash())
+
+		self.vectors['p'] = self.vectors['p'] + 1
+		other = embeddings.Embeddings.from_dict(self.vectors)
+		self.assertNotEqual(model.get_hash(), other.get_hash())
+
+	def test_convert(self):
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'nn')
+
+			with open(path, 'wb') as f:
+				pickle.dump(self.vectors, f, protocol=3)
+
+			with warnings.catch_warnings(record=True) as caught:
+				warnings.simplefilter('always')
+				model = embeddings.load(path)
+
+			self.assertEqual(len(caught), 1)
+			self.assertEqual(set(model), set(self.vectors))
+
+			embeddings.convert(path)
+
+			self.assertTrue(os.path.exists(path + '.npy'))
+			self.assertTrue(os.path.exists(path + '.json'))
+
+			model = embeddings.load(path)
+			self.assertIsInstance(model.matrix, np.memmap)
+
+			for token, vector in self.vectors.items():
+				self.assertTrue((model[token] == vector).all())
+
+			del model
+
+
+
+class NnTestCase(TestCase):
+
+	module = nn
+
+	def setUp(self):
+		self.temp_dir = tempfile.TemporaryDirectory()
+
+		vectors = {token: np.random.rand(4).astype(np.float32)
+					for token in ['', 'p', 'a', 'tʃ', 'ə']}
+		vectors['ə'][:] = 0
+
+		path = os.path.join(self.temp_dir.name, 'model')
+		embeddings.save(vectors, path)
+
+		self.module.load(path)
+
+	def tearDown(self):
+		self.module.VECTORS = None
+		self.temp_dir.cleanup()
+
+	def test_calc_delta_matrix(self):
+		phons_a = ['p', 'a', 't͡ʃ', 'pa', '']
+		phons_b = ['a', 'x', 'p', '', 'ə']
+
+		with warnings.catch_warnings():
+			warnings.simplefilter('ignore')
+			matrix = self.module.calc_delta_matrix(phons_a, phons_b)
+
+			self.assertEqual(matrix.shape, (5, 5))
+
+			for index_a, phon_a in enumerate(phons_a):
+				for index_b, phon_b in enumerate(phons_b[:4]):
+					self.assertAlmostEqual(matrix[index_a, index_b],
+							self.module.calc_delta(phon_a, phon_b), places=5)
+
+		self.assertTrue((matrix[:, 4] == 1).all())
+
+
+
+class RnnTestCase(NnTestCase):
+
+	module = rnn
@@ -0,0 +1,105 @@
+import json
+import os.path
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from code.align import COUNTERS, simple_align
+from code.stats import Stats
+
+
+
+class FakeClock:
+	"""
+	Stands in for the time module in code.stats, so that the tests control
+	the wall and the cpu time that pass.
+	"""
+
+	def __init__(self):
+		self.wall, self.cpu = 0.0, 0.0
+
+	def perf_counter(self):
+		return self.wall
+
+	def process_time(self):
+		return self.cpu
+
+	def tick(self, wall, cpu):
+		self.wall += wall
+		self.cpu += cpu
+
+
+
+class StatsTestCase(TestCase):
+
+	def setUp(self):
+		self.clock = FakeClock()
+
+		patcher = patch('code.stats.time', self.clock)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_nested_stages(self):
+		stats = Stats()
+
+		with stats.stage('outer'):
+			self.clock.tick(3, 2)
+			with stats.stage('inner'):
+				self.clock.tick(7, 5)
+			self.clock.tick(1, 1)
+
+		self.clock.tick(100, 100)
+
+		with stats.stage('inner'):
+			self.clock.tick(7, 5)
+
+		self.assertEqual(stats.stages['outer'], [4, 3])
+		self.assertEqual(stats.stages['inner'], [14, 10])
+
+	def test_iter_stage(self):
+		stats = Stats()
+
+		def gen():
+			for index in range(3):
+				self.clock.tick(2, 1)
+				yield index
+
+		items = []
+
+		with stats.stage('consume'):
+			for item in stats.iter_stage('produce', gen()):
+				items.append(item)
+				self.clock.tick(1, 1)
+
+		self.assertEqual(items, [0, 1, 2])
+		self.assertEqual(stats.stages['produce'], [6, 3])
+		self.assertEqual(stats.stages['consume'], [3, 3])
+
+	def test_counters(self):
+		COUNTERS.clear()
+		simple_align('abc', 'abd', lambda a, b: 0 if a == b else 1)
+
+		self.assertEqual(COUNTERS['cells'], 16)
+		self.assertEqual(COUNTERS['costs'], 15)
+		COUNTERS.clear()
+
+	def test_write(self):
+		stats = Stats()
+
+		with stats.stage('align'):
+			self.clock.tick(2, 1)
+
+		stats.count('pairs', 10)
+
+		with tempfile.TemporaryDirectory() as temp_dir:
+			path = os.path.join(temp_dir, 'stats.json')
+			stats.write(path)
+
+			with open(path, encoding='utf-8') as f:
+				data = json.load(f)
+
+		self.assertEqual(data['counters'], {'pairs': 10})
+		self.assertEqual(set(data['stages']), set(['align']))
+		self.assertEqual(data['pairs_per_sec'], 5)
+		self.assertIn('pairs/s', stats.format())
@@ -1,5 +1,8 @@
 import contextlib
+import os
+import os.path
 import sys
+import tempfile
 
 
 
@@ -39,3 +42,50 @@ def open_for_writing(path, newline=None):
 			yield f
 	else:
 		yield sys.stdout
+
+
+
+def get_umask():
+	"""
+	Return the umask of the process; there is no way to read it without also
+	setting it, so it is set back right away.
+	"""
+	umask = os.umask(0o022)
+	os.umask(umask)
+
+	return umask
+
+
+
+@contextlib.contextmanager
+def open_for_replacing(path, mode='w'):
+	"""
+	Context manager for writing a file atomically, so that concurrent readers
+	never see it half-written: the file object is that of a temporary file in
+	the same dir, which is moved onto the given path once the block is exited
+	and removed if an exception is raised in it. The mode should be either w
+	(text, written in utf-8) or wb. The file gets the permissions that open()
+	would give it, rather than the owner-only ones of temporary files.
+
+	Usage:
+
+		with open_for_replacing('cache.npy', 'wb') as f:
+			np.save(f, matrix)
+	"""
+	dir_path = os.path.dirname(path) or os.curdir
+	encoding = None if 'b' in mode else 'utf-8'
+
+	f = tempfile.NamedTemporaryFile(
+			mode, encoding=encoding, dir=dir_path, delete=False)
+
+	try:
+		with f:
+			yield f
+
+		os.chmod(f.name, 0o666 & ~get_umask())
+		os.replace(f.name, path)
+
+	except BaseException:
+		with contextlib.suppress(OSError):
+			os.remove(f.name)
+		raise
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import argparse
+import os.path
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+
+"""
+The modules the import time of which is measured by default.
+"""
+DEFAULT_MODULES = [
+	'code.phon.one_hot', 'code.phon.phoible', 'code.phon.phoible_sub',
+	'code.phon.phon2vec', 'code.phon.nn', 'code.phon.rnn', 'code.cli']
+
+
+"""
+The third-party packages that are only needed for training models and which
+should not be imported on the alignment path.
+"""
+HEAVY_PACKAGES = ['tensorflow', 'keras', 'gensim', 'sklearn']
+
+
+"""
+The code run in a fresh interpreter for each measurement; it prints the import
+time in seconds and the heavy packages that got imported along.
+"""
+SNIPPET = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(' '.join([name for name in {heavy!r} if name in sys.modules]))
+'''
+
+
+
+def measure(module, repeat=5):
+	"""
+	Import the given module in that many fresh interpreters. Return the list
+	of import times in seconds and the list of heavy packages imported along.
+	Raise a ValueError if the module cannot be imported.
+	"""
+	snippet = SNIPPET.format(module=module, heavy=HEAVY_PACKAGES)
+	timings = []
+
+	for _ in range(repeat):
+		proc = subprocess.run(
+				[sys.executable, '-c', snippet], cwd=BASE_DIR,
+				stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+				universal_newlines=True)
+
+		if proc.returncode:
+			error = proc.stderr.strip().split('\n')[-1]
+			raise ValueError('cannot import {}: {}'.format(module, error))
+
+		lines = proc.stdout.split('\n')
+		timings.append(float(lines[0]))
+
+	return timings, lines[1].split()
+
+
+
+"""
+The cli
+"""
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=(
+		'measure the time it takes to import the modules used on the '
+		'alignment path, each in a fresh interpreter, and check that none of '
+		'the training-only dependencies gets imported along'))
+
+	parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help=(
+		'the modules to import; the default is the code.phon modules and '
+		'code.cli'))
+	parser.add_argument('--repeat', type=int, default=5, help=(
+		'how many times to import each module; the default is 5'))
+
+	args = parser.parse_args()
+
+	for module in args.modules:
+		try:
+			timings, heavy = measure(module, args.repeat)
+		except ValueError as err:
+			print('{:<24}{}'.format(module, err))
+			continue
+
+		print('{:<24}min {:.3f}s  median {:.3f}s  heavy: {}'.format(
+				module, min(timings), statistics.median(timings),
+				' '.join(heavy) if heavy else '-'))
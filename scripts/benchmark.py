@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+
+import argparse
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import os.path
+import sys
+import tempfile
+import time
+import warnings
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, BASE_DIR)
+
+from code.align import (
+		ALGORITHMS, SCORE_ALGORITHMS, UNIT_COST_FUNCS, get_align_func)
+from code.cli import init_dataset
+from code.data import AlignmentsDataset, WordsDataset, write_alignments
+from code.eval import evaluate
+from code.main import align_lang_pair, collect_inventories
+from code.phon.base import Phon
+from code.stats import Stats
+
+
+
+"""
+The datasets benchmarked by default: the BDPA ones, which come with
+gold-standard alignments to score against, and the SVMCC lexicons.
+"""
+DEFAULT_DATASETS = \
+	sorted(glob.glob(os.path.join(BASE_DIR, 'data', 'bdpa', '*.psa'))) \
+	+ sorted(glob.glob(os.path.join(BASE_DIR, 'data', 'svmcc', '*.tsv')))
+
+
+"""
+The relative changes in pairs per second and in memory that are reported as
+regressions by default when comparing against a baseline.
+"""
+DEFAULT_TOLERANCE = 0.25
+
+
+
+def get_tasks(dataset, max_pairs=None):
+	"""
+	Return the [(word_pairs, inventory_a, inventory_b), ..] list of the
+	dataset's language pairs, as main.main would align them, cut off after
+	the first max_pairs word pairs (if this is set).
+	"""
+	phon_inv = collect_inventories(dataset)
+	tasks, num_pairs = [], 0
+
+	for lang_a, lang_b in itertools.combinations(dataset.get_langs(), 2):
+		word_pairs = dataset.get_word_pairs(lang_a, lang_b)
+
+		if max_pairs is not None:
+			word_pairs = word_pairs[:max_pairs - num_pairs]
+
+		if word_pairs:
+			tasks.append((word_pairs, phon_inv[lang_a], phon_inv[lang_b]))
+			num_pairs += len(word_pairs)
+
+		if max_pairs is not None and num_pairs >= max_pairs:
+			break
+
+	return tasks
+
+
+
+def score(dataset, alignments, header):
+	"""
+	Return the Kondrak score of the alignments against the gold-standard ones
+	of the dataset, as a percentage of the pairs aligned. The alignments are
+	written to a temporary psa file and read back, as eval.py would do.
+	"""
+	with tempfile.TemporaryDirectory() as temp_dir:
+		path = os.path.join(temp_dir, 'output.psa')
+		write_alignments(alignments, path, header)
+
+		evaluation = evaluate(dataset, AlignmentsDataset(path))
+
+	return evaluation.score / evaluation.num_total * 100
+
+
+
+def measure(path, algorithm, vectors, max_pairs=None, repeat=3,
+				bitparallel=True):
+	"""
+	Align the (first max_pairs) word pairs of the dataset at the given path
+	that many times using the given algorithm and vectors. Return a dict with
+	the number of pairs, the best wall and cpu times, the pairs per second of
+	the former, the peak memory usage before and after aligning, and, if the
+	dataset has gold-standard alignments, their Kondrak score. If the scoring
+	fails, the score is left as None and the error is kept as score_error, so
+	that the timings are still reported.
+
+	If bitparallel is False, the align funcs are not replaced by their
+	bit-parallel counterparts for unit cost models (see UNIT_COST_FUNCS), so
+	that the speedup of the latter can be measured.
+
+	Meant to be run in a fresh process, so that the memory usage and caches of
+	one measurement do not affect the next one. Raise a ValueError if the
+	dataset or the vectors cannot be loaded.
+	"""
+	warnings.simplefilter('ignore')
+
+	dataset = init_dataset(path, columns=WordsDataset.DEFAULT_COLUMNS)
+	tasks = get_tasks(dataset, max_pairs)
+
+	phon = Phon(vectors)
+	phon.load()
+
+	align_func = get_align_func(algorithm)
+
+	stats = Stats()
+	rss_before = stats.get_peak_rss()
+
+	walls, cpus = [], []
+
+	unit_cost_funcs = dict(UNIT_COST_FUNCS)
+	if not bitparallel:
+		UNIT_COST_FUNCS.clear()
+
+	try:
+		for _ in range(repeat):
+			wall, cpu = time.perf_counter(), time.process_time()
+
+			output = [align_lang_pair(phon, align_func, *task) for task in tasks]
+
+			walls.append(time.perf_counter() - wall)
+			cpus.append(time.process_time() - cpu)
+	finally:
+		UNIT_COST_FUNCS.update(unit_cost_funcs)
+
+	num_pairs = sum([len(word_pairs) for word_pairs, _, _ in tasks])
+
+	res = {
+		'pairs': num_pairs,
+		'wall': min(walls),
+		'cpu': min(cpus),
+		'pairs_per_sec': num_pairs / min(walls) if min(walls) else None,
+		'rss_before': rss_before,
+		'rss_peak': stats.get_peak_rss(),
+		'score': None }
+
+	if isinstance(dataset, AlignmentsDataset) \
+			and algorithm not in SCORE_ALGORITHMS:
+		try:
+			res['score'] = score(
+					dataset, itertools.chain(*output), dataset.header)
+		except Exception as err:
+			res['score_error'] = '{}: {}'.format(type(err).__name__, err)
+
+	return res
+
+
+
+def run_in_process(*args):
+	"""
+	Call measure with the given args in a fresh interpreter and return its
+	result. Raise a ValueError if the measurement fails.
+	"""
+	context = multiprocessing.get_context('spawn')
+
+	with context.Pool(1) as pool:
+		try:
+			return pool.apply(measure, args)
+		except Exception as err:
+			raise ValueError('{}: {}'.format(type(err).__name__, err))
+
+
+
+def get_key(path, algorithm, vectors, bitparallel=True):
+	"""
+	Return the string identifying a measurement in a results dict; the
+	dataset is identified by its path relative to the repo's root.
+	"""
+	path = os.path.relpath(os.path.abspath(path), BASE_DIR)
+	key = '{} {} {}'.format(path.replace(os.sep, '/'), algorithm, vectors)
+
+	return key if bitparallel else key + ' no-bitparallel'
+
+
+
+def compare(res, base, tolerance=DEFAULT_TOLERANCE):
+	"""
+	Compare a measurement against its baseline counterpart. Return the list
+	of the regressions found, as human-readable strings: slowdowns and memory
+	growth beyond the tolerance, as well as any change in the score.
+	"""
+	regressions = []
+
+	if res['pairs'] != base['pairs']:
+		return ['{} pairs instead of {}'.format(res['pairs'], base['pairs'])]
+
+	if res['pairs_per_sec'] and base['pairs_per_sec'] \
+			and res['pairs_per_sec'] < base['pairs_per_sec'] * (1 - tolerance):
+		regressions.append('pairs/s {:.0f} → {:.0f}'.format(
+				base['pairs_per_sec'], res['pairs_per_sec']))
+
+	if res['rss_peak'] and base['rss_peak'] \
+			and res['rss_peak'] > base['rss_peak'] * (1 + tolerance):
+		regressions.append('peak rss {:.1f} → {:.1f} MiB'.format(
+				base['rss_peak'] / 2**20, res['rss_peak'] / 2**20))
+
+	if base['score'] is not None and (res['score'] is None
+			or abs(res['score'] - base['score']) > 1e-9):
+		regressions.append('score {:.2f} → {}'.format(base['score'],
+				'-' if res['score'] is None else '{:.2f}'.format(res['score'])))
+
+	return regressions
+
+
+
+def format_result(key, res):
+	"""
+	Return a line of the report for the given measurement.
+	"""
+	line = '{:<48}{:>7} pairs {:>9.1f} pairs/s {:>8} MiB  score {}'.format(
+			key, res['pairs'], res['pairs_per_sec'] or 0,
+			'-' if res['rss_peak'] is None
+				else '{:.1f}'.format(res['rss_peak'] / 2**20),
+			'-' if res['score'] is None else '{:.2f}%'.format(res['score']))
+
+	if res.get('score_error'):
+		line += ' ({})'.format(res['score_error'])
+
+	return line
+
+
+
+"""
+The cli
+"""
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=(
+		'time each alignment algorithm with each vectors module on the bdpa '
+		'and svmcc datasets, each measurement in a fresh interpreter; report '
+		'the pairs aligned per second, the peak memory usage, and the Kondrak '
+		'score, and compare these against a baseline'))
+
+	parser.add_argument('datasets', nargs='*', default=DEFAULT_DATASETS, help=(
+		'the datasets to align; the default is data/bdpa/*.psa and '
+		'data/svmcc/*.tsv'))
+	parser.add_argument(
+		'--align', nargs='+', choices=sorted(ALGORITHMS),
+		default=sorted(ALGORITHMS), help=(
+			'the algorithms to benchmark; the default is all of them'))
+	parser.add_argument(
+		'--vectors', nargs='+', choices=Phon.MODULES,
+		default=Phon.MODULES, help=(
+			'the vectors modules to benchmark; the default is all of them, '
+			'the ones that cannot be loaded (e.g. models not yet trained) '
+			'are reported and skipped'))
+	parser.add_argument('--max-pairs', type=int, default=1000, help=(
+		'align at most that many word pairs of each dataset, taken from its '
+		'language pairs in order; set to 0 for no limit; the default is 1000'))
+	parser.add_argument('--repeat', type=int, default=3, help=(
+		'how many times to align the pairs, the best time is reported; '
+		'the default is 3'))
+	parser.add_argument('--baseline', help=(
+		'path to a json file with the results of a previous run to compare '
+		'against; the exit status is 1 if there are regressions'))
+	parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+		help=(
+			'the relative slowdown or memory growth that is reported as a '
+			'regression; the default is {}'.format(DEFAULT_TOLERANCE)))
+	parser.add_argument('--engines', action='store_true', help=(
+		'also time the algorithms that have a bit-parallel counterpart for '
+		'unit cost models without the latter, reported as no-bitparallel, '
+		'to check that the bit-parallel engine pays off'))
+	parser.add_argument('--output', help=(
+		'path where to write the results in json format, e.g. to serve as '
+		'the baseline of later runs'))
+
+	args = parser.parse_args()
+
+	if args.repeat < 1:
+		parser.error('--repeat should be a positive integer')
+
+	baseline = {}
+	if args.baseline:
+		with open(args.baseline, encoding='utf-8') as f:
+			baseline = json.load(f)
+
+	results, num_regressions = {}, 0
+
+	engines = [True]
+	if args.engines:
+		engines.append(False)
+
+	for path, algorithm, vectors, bitparallel in itertools.product(
+			args.datasets, args.align, args.vectors, engines):
+		if not bitparallel \
+				and get_align_func(algorithm) not in UNIT_COST_FUNCS:
+			continue
+
+		key = get_key(path, algorithm, vectors, bitparallel)
+
+		try:
+			res = run_in_process(path, algorithm, vectors,
+					args.max_pairs or None, args.repeat, bitparallel)
+		except ValueError as err:
+			print('{:<48}{}'.format(key, err))
+			continue
+
+		results[key] = res
+		print(format_result(key, res), flush=True)
+
+		if key in baseline:
+			regressions = compare(res, baseline[key], args.tolerance)
+			for regression in regressions:
+				print('{:<48}REGRESSION: {}'.format('', regression))
+			num_regressions += len(regressions)
+
+	if args.output:
+		with open(args.output, 'w', encoding='utf-8') as f:
+			json.dump(results, f, indent=4, sort_keys=True)
+
+	if baseline:
+		print('{} regressions against {}'.format(num_regressions, args.baseline))
+
+	sys.exit(1 if num_regressions else 0)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+
+import argparse
+import os.path
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, BASE_DIR)
+
+from code.phon import embeddings
+
+
+
+"""
+The cli
+"""
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=(
+		'convert a pickled dict mapping IPA tokens to vectors (i.e. an nn or '
+		'rnn model in the old format) into a memory-mappable model'))
+
+	parser.add_argument('model', help=(
+		'path to the pickled dict'))
+	parser.add_argument('output', nargs='?', help=(
+		'path where to store the converted model to; '
+		'by default this is the path of the pickled dict, with the .npy and '
+		'.json files written next to it'))
+
+	args = parser.parse_args()
+
+	try:
+		embeddings.convert(args.model, args.output)
+	except (OSError, ValueError) as err:
+		parser.error(str(err))
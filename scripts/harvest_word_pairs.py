@@ -2,38 +2,45 @@
 
 import argparse
 import itertools
+import math
 import os.path
 import sys
 
-import editdistance
-
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(1, BASE_DIR)
 
+from code.align import within_distance
 from code.cli import validate_columns, init_dataset
 from code.utils import open_for_writing
 
 
 
-def calc_ldn(seq_a, seq_b):
-	"""
-	Calculate the normalised Levenshtein distance between two sequences.
-	"""
-	return editdistance.eval(seq_a, seq_b) / max(len(seq_a), len(seq_b))
-
-
-
 def harvest_pairs(dataset, threshold):
 	"""
 	From the dataset, return the IPA transcriptions of those same-meaning word
 	pairs the LDN between which is below threshold.
+
+	The Levenshtein distance is only computed as far as it can still be low
+	enough; the pairs that differ too much in length are skipped right away.
+	As the distance is a whole number, it only needs to be checked against the
+	largest one that is still below the threshold once normalised.
 	"""
 	pairs = []
 
 	for lang_a, lang_b in itertools.combinations(dataset.get_langs(), 2):
 		for word_a, word_b in dataset.get_word_pairs(lang_a, lang_b):
-			if calc_ldn(word_a.ipa, word_b.ipa) < threshold:
-				pairs.append((word_a.ipa, word_b.ipa))
+			seq_a, seq_b = word_a.ipa, word_b.ipa
+			max_len = max(len(seq_a), len(seq_b))
+
+			if not max_len:
+				continue
+
+			max_dist = math.ceil(threshold * max_len)
+			while max_dist >= 0 and max_dist / max_len >= threshold:
+				max_dist -= 1
+
+			if max_dist >= 0 and within_distance(seq_a, seq_b, max_dist):
+				pairs.append((seq_a, seq_b))
 
 	return pairs
 
@@ -2,13 +2,19 @@
 
 import argparse
 import collections
-import pickle
+import os.path
+import sys
 
 import matplotlib.pyplot as plt
 import numpy as np
 
 from sklearn.decomposition import PCA
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(1, BASE_DIR)
+
+from code.phon import embeddings
+
 
 
 BASIC_TOKENS = collections.OrderedDict({
@@ -26,10 +32,9 @@ BASIC_TOKENS = collections.OrderedDict({
 def plot(model_path, tokens):
 	"""
 	Apply PCA on IPA token embeddings and plot the 2d vectors of a subset of
-	the tokens. The model should be a pickled {token: embedding} dict.
+	the tokens. The model should be one stored by the nn or rnn trainers.
 	"""
-	with open(model_path, 'rb') as f:
-		model = pickle.load(f)
+	model = embeddings.load(model_path)
 
 	all_tokens = sorted(model.keys())
 	all_vectors = np.array([model[token] for token in all_tokens])
@@ -59,10 +64,10 @@ The cli
 """
 if __name__ == '__main__':
 	parser = argparse.ArgumentParser(description=(
-		'read a pickled dict mapping IPA tokens to vectors, '
+		'read a model mapping IPA tokens to vectors, '
 		'pca the vectors to 2 dimensions, and plot a subset of these'))
 	parser.add_argument('model', help=(
-		'path to the pickled dict, i.e. a trained model'))
+		'path to the trained model'))
 	parser.add_argument('subset', choices=BASIC_TOKENS.keys(), help=(
 		'the subset to plot'))
 